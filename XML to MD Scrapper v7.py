@@ -1,6 +1,11 @@
+# The v7 converter: one if/elif ladder per element, each act built up as a
+# string. The converter has since moved to xml_to_md.py; this version is
+# kept as it was, as the baseline that benchmark.py and the golden tests
+# hold xml_to_md.py to. Running the script runs the current sync:
+#
+#   python "XML to MD Scrapper v7.py" --csv "All Acts.csv" --mirror xml
+
 import xml.etree.ElementTree as ET
-import pandas as pd
-import os
 import urllib.request
 
 def xml_to_md(xml_file, output_md_file):
@@ -150,34 +155,6 @@ def handle_subparagraph(subparagraph):
             md += f" {cont_text}"
     return md
 
-def main():
-    # Create the output directory if it doesn't exist
-    output_dir = 'C:\\Users\\chris\\Documents\\md files'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # Read the CSV file
-    try:
-        df = pd.read_csv('All Acts.csv')
-    except FileNotFoundError:
-        print("Error: 'All Acts.csv' not found.")
-        return
-    except Exception as e:
-        print(f"Error reading 'All Acts.csv': {e}")
-        return
-
-    # Loop through the 'xml_link' column
-    for index, row in df.iterrows():
-        xml_link = row['xml_link']
-        
-        # Extract filename from the URL
-        filename = xml_link.split('/')[-1].replace('.xml', '').replace('.XML', '')
-        output_md_file = os.path.join(output_dir, f'{filename}.md')
-
-        print(f"Processing {xml_link}...")
-        xml_to_md(xml_link, output_md_file)
-        print(f"Generated {output_md_file}")
-
 if __name__ == "__main__":
-    # main()
-    xml_to_md('https://laws-lois.justice.gc.ca/eng/XML/I-3.3.xml', 'MD Files\\I-3.3.md')
\ No newline at end of file
+    from xml_to_md import cli
+    cli()
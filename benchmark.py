@@ -0,0 +1,290 @@
+import xml.etree.ElementTree as ET
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import importlib.util
+import urllib.request
+
+# Benchmarks the "XML to MD Scrapper vN.py" converters against each other on
+# synthetic, Justice-Laws-shaped statutes, entirely offline. For every
+# version and act size it records the end-to-end time of xml_to_md(), the
+# parse/render/write split, peak Python memory and output size, and saves
+# the lot as JSON so two runs can be compared with --compare.
+#
+#   python benchmark.py --sections 100,1000,5000 --versions v5,v6,v7,current
+#   python benchmark.py --output after.json --compare before.json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+NESTING = ['Subsection', 'Paragraph', 'Subparagraph', 'Clause']
+
+def generate_statute(sections, depth=4, definitions=20, seed=0):
+    # Build a statute with `sections` sections, each nested `depth` levels
+    # deep through Subsection/Paragraph/Subparagraph/Clause, plus a
+    # definitions section with `definitions` defined terms. Structure,
+    # tags and inline markup follow the laws-lois.justice.gc.ca XML.
+    rng = random.Random(seed)
+    words = ('person Minister prescribed amount property taxation year corporation day '
+             'subsection paragraph reference respect purpose Canada province means includes').split()
+
+    def sentence(n=12):
+        return ' '.join(rng.choice(words) for _ in range(n))
+
+    def text(n=12):
+        # Occasional cross-references, as in the real acts
+        if rng.random() < 0.2:
+            return (f'<Text>{sentence(n)} section <XRefInternal>{rng.randint(1, sections)}</XRefInternal> '
+                    f'of the <XRefExternal reference-type="act" link="C-46">Criminal Code</XRefExternal>.</Text>')
+        return f'<Text>{sentence(n)}.</Text>'
+
+    def nested(level, label):
+        tag = NESTING[level]
+        parts = [f'<{tag}><Label>{label}</Label>']
+        if tag == 'Subsection':
+            parts.append(f'<MarginalNote>{sentence(3)}</MarginalNote>')
+        parts.append(text())
+        if level + 1 < depth:
+            for i in range(rng.randint(1, 3)):
+                parts.append(nested(level + 1, child_label(level + 1, i)))
+            if tag == 'Paragraph' and rng.random() < 0.3:
+                parts.append(f'<ContinuedParagraph>{text()}</ContinuedParagraph>')
+            if tag == 'Subparagraph' and rng.random() < 0.3:
+                parts.append(f'<ContinuedSubparagraph>{text()}</ContinuedSubparagraph>')
+        if tag == 'Subsection':
+            parts.append('<HistoricalNote><HistoricalNoteSubItem>1990, c. 1</HistoricalNoteSubItem></HistoricalNote>')
+        parts.append(f'</{tag}>')
+        return ''.join(parts)
+
+    def child_label(level, i):
+        tag = NESTING[level]
+        if tag == 'Subsection':
+            return f'({i + 1})'
+        if tag == 'Paragraph':
+            return f'({chr(ord("a") + i)})'
+        if tag == 'Subparagraph':
+            return f'({"i" * (i + 1)})'
+        return f'({chr(ord("A") + i)})'
+
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+           '<Statute xmlns:lims="http://justice.gc.ca/lims" lims:id="1">',
+           '<Identification><LongTitle>An Act respecting benchmarks</LongTitle>',
+           '<ShortTitle status="official">Benchmark Act</ShortTitle>',
+           '<Chapter><ConsolidatedNumber official="yes">B-0.1</ConsolidatedNumber></Chapter>',
+           '</Identification><Body>']
+    for number in range(1, sections + 1):
+        if number % 25 == 1:
+            out.append(f'<Heading level="2"><Label>PART {number // 25 + 1}</Label>'
+                       f'<TitleText>{sentence(4)}</TitleText></Heading>')
+        out.append(f'<Section><Label>{number}</Label><MarginalNote>{sentence(3)}</MarginalNote>')
+        if number == 2 and definitions:
+            out.append('<Text>The following definitions apply in this Act.</Text>')
+            for i in range(definitions):
+                out.append(f'<Definition><Text><DefinedTermEn>term {i}</DefinedTermEn> means {sentence(10)}; '
+                           f'(<DefinedTermFr>terme {i}</DefinedTermFr>)</Text>')
+                if depth > 1 and rng.random() < 0.2:
+                    out.append(f'<Paragraph><Label>(a)</Label><Text>{sentence(6)}; '
+                               f'(<DefinedTermFr>x</DefinedTermFr>)</Text></Paragraph>')
+                out.append('</Definition>')
+        elif depth:
+            for i in range(rng.randint(1, 3)):
+                out.append(nested(0, child_label(0, i)))
+        else:
+            out.append(text(30))
+        out.append('</Section>')
+    out.append('</Body></Statute>')
+    return ''.join(out).encode('utf-8')
+
+# The converter as it is now, in xml_to_md.py, next to the scripts it
+# replaced
+MODULES = {'current': 'xml_to_md'}
+
+def load_version(version):
+    # "v6" -> the module in "XML to MD Scrapper v6.py"; "current" -> xml_to_md
+    if version in MODULES:
+        return importlib.import_module(MODULES[version])
+    path = os.path.join(HERE, f'XML to MD Scrapper {version}.py')
+    spec = importlib.util.spec_from_file_location(f'scrapper_{version.replace(".", "_")}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class _TimedET:
+    # Stands in for the converter module's `ET` so that time spent in
+    # ET.parse / ET.fromstring is attributed to the parse phase.
+    def __init__(self, et, phases):
+        self._et = et
+        self._phases = phases
+
+    def __getattr__(self, name):
+        return getattr(self._et, name)
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._phases['parse'] += time.perf_counter() - start
+
+    def parse(self, *args, **kwargs):
+        return self._timed(self._et.parse, *args, **kwargs)
+
+    def fromstring(self, *args, **kwargs):
+        return self._timed(self._et.fromstring, *args, **kwargs)
+
+class _TimedFile:
+    # Wraps the output file so time spent in write() is the write phase
+    def __init__(self, f, phases):
+        self._f = f
+        self._phases = phases
+
+    def write(self, data):
+        start = time.perf_counter()
+        try:
+            return self._f.write(data)
+        finally:
+            self._phases['write'] += time.perf_counter() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        start = time.perf_counter()
+        self._f.close()
+        self._phases['write'] += time.perf_counter() - start
+
+def measure_phases(module, url, output_md_file):
+    # One run with parse and write instrumented; render is what is left.
+    phases = {'parse': 0.0, 'write': 0.0}
+    module.ET = _TimedET(ET, phases)
+    module.open = lambda *args, **kwargs: _TimedFile(open(*args, **kwargs), phases)
+    try:
+        start = time.perf_counter()
+        module.xml_to_md(url, output_md_file)
+        total = time.perf_counter() - start
+    finally:
+        module.ET = ET
+        del module.open
+    phases['render'] = max(0.0, total - phases['parse'] - phases['write'])
+    return phases
+
+def measure(module, url, output_md_file, repeat, **kwargs):
+    # Best-of-`repeat` wall time, then a separate traced run for memory so
+    # tracemalloc's overhead doesn't leak into the timings.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        module.xml_to_md(url, output_md_file, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        module.xml_to_md(url, output_md_file, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def run(versions, sizes, depth, definitions, repeat, seed=0):
+    modules = {}
+    for version in versions:
+        try:
+            modules[version] = load_version(version)
+        except Exception as e:
+            print(f"Skipping {version}: {e}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for sections in sizes:
+            xml_path = os.path.join(tmp, f'bench-{sections}.xml')
+            with open(xml_path, 'wb') as f:
+                f.write(generate_statute(sections, depth, definitions, seed))
+            url = 'file://' + urllib.request.pathname2url(xml_path)
+            xml_bytes = os.path.getsize(xml_path)
+
+            for version, module in modules.items():
+                variants = [(version, {})]
+                # The current converter can also stream the act through iterparse
+                if 'streaming' in module.xml_to_md.__code__.co_varnames:
+                    variants.append((f'{version}-streaming', {'streaming': True}))
+                for name, kwargs in variants:
+                    output_md_file = os.path.join(tmp, f'{name}-{sections}.md')
+                    total, peak = measure(module, url, output_md_file, repeat, **kwargs)
+                    phases = measure_phases(module, url, output_md_file) if not kwargs else {}
+                    result = {
+                        'version': name,
+                        'sections': sections,
+                        'depth': depth,
+                        'definitions': definitions,
+                        'xml_bytes': xml_bytes,
+                        'md_bytes': os.path.getsize(output_md_file),
+                        'total_s': round(total, 6),
+                        'parse_s': round(phases['parse'], 6) if phases else None,
+                        'render_s': round(phases['render'], 6) if phases else None,
+                        'write_s': round(phases['write'], 6) if phases else None,
+                        'peak_bytes': peak,
+                    }
+                    results.append(result)
+                    print_row(result)
+    return results
+
+def print_header():
+    print(f"{'version':<18}{'sections':>9}{'xml MB':>8}{'total s':>9}{'parse s':>9}"
+          f"{'render s':>9}{'write s':>9}{'peak MB':>9}")
+
+def print_row(r):
+    def fmt(value):
+        return f"{value:>9.3f}" if value is not None else f"{'-':>9}"
+    print(f"{r['version']:<18}{r['sections']:>9}{r['xml_bytes'] / 1e6:>8.1f}{fmt(r['total_s'])}"
+          f"{fmt(r['parse_s'])}{fmt(r['render_s'])}{fmt(r['write_s'])}{r['peak_bytes'] / 1e6:>9.1f}")
+
+def compare(results, baseline_file):
+    # Print new/old ratios for every (version, size) present in both runs
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {(r['version'], r['sections'], r['depth'], r['definitions']): r
+                    for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_file} (ratio new/old, < 1 is better):")
+    print(f"{'version':<18}{'sections':>9}{'time':>9}{'peak mem':>10}")
+    for r in results:
+        old = baseline.get((r['version'], r['sections'], r['depth'], r['definitions']))
+        if old is None:
+            continue
+        print(f"{r['version']:<18}{r['sections']:>9}{r['total_s'] / old['total_s']:>9.2f}"
+              f"{r['peak_bytes'] / max(1, old['peak_bytes']):>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the XML to MD converters on synthetic statutes.")
+    parser.add_argument('--versions', default='v5,v6,v7,current', help="comma-separated converter versions")
+    parser.add_argument('--sections', default='100,1000,5000', help="comma-separated act sizes, in sections")
+    parser.add_argument('--depth', type=int, default=4, choices=range(0, len(NESTING) + 1),
+                        help="Subsection/Paragraph/Subparagraph/Clause nesting depth")
+    parser.add_argument('--definitions', type=int, default=20, help="defined terms in section 2")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per measurement (best is kept)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    print_header()
+    results = run(args.versions.split(','), [int(n) for n in args.sections.split(',')],
+                  args.depth, args.definitions, args.repeat, args.seed)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import json
+import mmap
+import time
+import struct
+import argparse
+from array import array
+
+# Packed output: every rendered act appended to one file, followed by an
+# offset index, written by "XML to MD Scrapper v7.py --bundle FILE":
+#
+#   MAGIC
+#   act Markdown, UTF-8, one after another
+#   padding to 8 bytes
+#   entries   (count, 2) int64 [offset, length] per entry
+#   keys      JSON list of entry keys, same order
+#   footer    FOOTER magic, entries offset, count, keys length
+#
+# An entry is either an act ("A-1") or, with --bundle-sections, one of
+# its Sections ("A-1/3"), which points into the act's own bytes rather
+# than being stored twice. The sections of an act are the entries right
+# after it. The reader memory-maps the file, so a lookup is one dict probe
+# and the result is a slice of the mapping: nothing is read or copied
+# until it is used.
+#
+#   python bundle.py get acts.bundle A-1
+#   python bundle.py get acts.bundle A-1 3
+#   python bundle.py info acts.bundle
+
+MAGIC = b'MDBUNDL1'
+FOOTER = struct.Struct('<8sQQQ')
+FOOTER_MAGIC = b'MDBIDX01'
+
+def section_key(act, section):
+    return f"{act}/{section}"
+
+def utf8_spans(text, spans):
+    # {label: (start, end)} in characters of `text` -> the same in bytes of
+    # its UTF-8 encoding, encoding each stretch between boundaries once
+    if text.isascii():
+        return dict(spans)
+    bounds = sorted({i for span in spans.values() for i in span})
+    offsets, pos, size = {}, 0, 0
+    for bound in bounds:
+        size += len(text[pos:bound].encode('utf-8'))
+        offsets[bound] = size
+        pos = bound
+    return {label: (offsets[start], offsets[end]) for label, (start, end) in spans.items()}
+
+class BundleWriter:
+    # Appends acts sequentially; nothing is readable until close() writes
+    # the index, so write to a temporary name and rename it into place.
+    def __init__(self, path):
+        self.f = open(path, 'wb')
+        self.f.write(MAGIC)
+        self.offset = len(MAGIC)
+        self.keys = []
+        self.seen = set()
+        self.entries = array('q')
+
+    def _entry(self, key, offset, length):
+        if key in self.seen:
+            raise ValueError(f"duplicate bundle entry {key!r}")
+        self.seen.add(key)
+        self.keys.append(key)
+        self.entries.extend((offset, length))
+
+    def add(self, act, data, sections=None):
+        # `data` is the act's encoded Markdown; `sections` maps a section
+        # label to its (start, end) byte span within it
+        self._entry(act, self.offset, len(data))
+        for label, (start, end) in (sections or {}).items():
+            self._entry(section_key(act, label), self.offset + start, end - start)
+        self.f.write(data)
+        self.offset += len(data)
+
+    def add_text(self, act, text, sections=None):
+        # Same, with character spans within `text`
+        self.add(act, text.encode('utf-8'), utf8_spans(text, sections) if sections else None)
+
+    def copy(self, bundle, act):
+        # Carry an act and its sections over from an older bundle
+        start = bundle.offset(act)
+        sections = {key.split('/', 1)[1]: (offset - start, offset - start + length)
+                    for key, offset, length in bundle.section_entries(act)}
+        self.add(act, bundle.get(act), sections)
+
+    def __contains__(self, act):
+        return act in self.seen
+
+    def close(self):
+        padding = -self.offset % 8
+        self.f.write(b'\0' * padding)
+        entries_offset = self.offset + padding
+        keys = json.dumps(self.keys, ensure_ascii=False).encode('utf-8')
+        self.f.write(self.entries.tobytes())
+        self.f.write(keys)
+        self.f.write(FOOTER.pack(FOOTER_MAGIC, entries_offset, len(self.keys), len(keys)))
+        self.f.close()
+
+class Bundle:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        if self._file.seek(0, 2) < len(MAGIC) + FOOTER.size:
+            # Too short to map or hold a footer: a write that never finished
+            self._file.close()
+            raise ValueError(f"{path} is not a complete bundle")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, entries_offset, count, keys_length = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if self._map[:len(MAGIC)] != MAGIC or magic != FOOTER_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a complete bundle")
+        self._view = memoryview(self._map)
+        keys_offset = entries_offset + 16 * count
+        self._entries = self._view[entries_offset:keys_offset].cast('q')
+        self.keys = json.loads(bytes(self._view[keys_offset:keys_offset + keys_length]))
+        self._index = {key: i for i, key in enumerate(self.keys)}
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def acts(self):
+        return [key for key in self.keys if '/' not in key]
+
+    def offset(self, key):
+        return self._entries[2 * self._index[key]]
+
+    def get(self, act, section=None):
+        # Zero-copy memoryview of the act's (or section's) UTF-8 Markdown;
+        # KeyError if it is not in the bundle
+        i = 2 * self._index[act if section is None else section_key(act, section)]
+        offset = self._entries[i]
+        return self._view[offset:offset + self._entries[i + 1]]
+
+    def text(self, act, section=None):
+        return str(self.get(act, section), 'utf-8')
+
+    def section_entries(self, act):
+        # [(key, offset, length)] of the act's sections, in document order
+        entries = []
+        prefix = act + '/'
+        for i in range(self._index[act] + 1, len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            entries.append((self.keys[i], self._entries[2 * i], self._entries[2 * i + 1]))
+        return entries
+
+    def close(self):
+        # Slices handed out by get() must have been released first
+        for view in ('_entries', '_view'):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Read acts and sections out of a packed Markdown bundle.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    get = sub.add_parser('get', help="print an act, or one of its sections")
+    get.add_argument('bundle')
+    get.add_argument('act')
+    get.add_argument('section', nargs='?', default=None)
+
+    info = sub.add_parser('info', help="entry counts and lookup time")
+    info.add_argument('bundle')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with Bundle(args.bundle) as bundle:
+        opened = time.perf_counter() - start
+        if args.command == 'get':
+            try:
+                print(bundle.text(args.act, args.section), end='')
+            except KeyError:
+                print(f"Error: {args.act}{' s. ' + args.section if args.section else ''} is not in the bundle.")
+            return
+        acts = bundle.acts()
+        start = time.perf_counter()
+        size = sum(len(bundle.get(act)) for act in acts)
+        elapsed = time.perf_counter() - start
+        print(f"{len(acts)} acts, {len(bundle) - len(acts)} sections, {size / 1e6:.1f} MB of Markdown; "
+              f"opened in {opened * 1000:.1f} ms, {elapsed / max(len(acts), 1) * 1e6:.1f} us per lookup")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import re
+import glob
+
+# Helpers shared by the indexes built over the converter's per-act outputs
+# (lexical_index.py, xref_graph.py, defined_terms.py, embeddings.py).
+# Standard library only, so the pure-Python indexes don't pull in NumPy.
+#
+# With --bilingual the French outputs sit next to the English ones as
+# <act>.fra.sections.jsonl, <act>.fra.chunks.jsonl, ... Both languages
+# share act IDs and section labels, so each index covers one language:
+# the English one in the index directory itself, the French one in its
+# fra/ subdirectory.
+
+LANGUAGES = ('eng', 'fra')
+
+token_re = re.compile(r"\w+")
+
+def tokenize(text):
+    return token_re.findall(text.lower())
+
+def output_files(output_dir, kind, language='eng'):
+    # The <act>.<kind>.jsonl files of one language, e.g. kind='sections'
+    french = f'.fra.{kind}.jsonl'
+    return [path for path in sorted(glob.glob(os.path.join(output_dir, f'*.{kind}.jsonl')))
+            if path.endswith(french) == (language == 'fra')]
+
+def section_files(output_dir, language='eng'):
+    return output_files(output_dir, 'sections', language)
+
+def language_dir(index_dir, language='eng'):
+    return index_dir if language == 'eng' else os.path.join(index_dir, language)
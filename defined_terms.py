@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import argparse
+from collections import deque
+
+from corpus import LANGUAGES, section_files, tokenize
+
+# Corpus-wide index of defined terms, built from the <act>.sections.jsonl
+# files written by "XML to MD Scrapper v7.py --terms DIR", and an
+# annotation of every section with the defined terms it uses:
+#
+#   terms.jsonl        one definition per line: term, act, section, scope,
+#                      scope_heading, text
+#   annotations.jsonl  one section per line: act, section and
+#                      [term, defining section, uses] for each term it uses
+#
+# A definition applies to the sections of its own act within its scope:
+# the whole act, the Part/Division/Subdivision under whose heading it sits,
+# or its own section. All distinct terms are compiled once into a word-level
+# Aho-Corasick automaton, so each section is matched against every term in
+# one pass over its tokens, however many terms the corpus defines.
+#
+#   python defined_terms.py build "md files" terms
+#   python defined_terms.py define terms "designated person"
+#   python defined_terms.py used-in terms A-1 12
+
+# Narrowest first: a section-level definition beats an act-wide one
+SCOPES = ['subsection', 'section', 'subdivision', 'division', 'part', 'act']
+
+class TermMatcher:
+    # Aho-Corasick automaton whose alphabet is word tokens, so matches always
+    # start and end on word boundaries.
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for i, tokens in enumerate(patterns):
+            state = 0
+            for token in tokens:
+                nxt = self.goto[state].get(token)
+                if nxt is None:
+                    nxt = self.goto[state][token] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(i)
+
+        # Breadth-first, so each state's failure link is final before its
+        # children need it; outputs of the failure state are inherited.
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, nxt in self.goto[state].items():
+                pending.append(nxt)
+                fail = self.fail[state]
+                while fail and token not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[nxt] = self.goto[fail].get(token, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, tokens):
+        # Yield the pattern index of every match, overlapping ones included
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                yield from out[state]
+
+def iter_sections(files):
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+# How the headings of each scope begin in either language: "PART 2
+# Offences", "PARTIE 2 Infractions", "SECTION 1" for a French Division
+HEADING_WORDS = {'part': ('part', 'partie'), 'division': ('division', 'section'),
+                 'subdivision': ('subdivision', 'sous-section')}
+
+def scope_heading(scope, headings):
+    # The open heading a Part/Division/Subdivision-scoped definition is tied
+    # to, e.g. "PART 2 Offences"; None when it applies by act or section.
+    if scope in HEADING_WORDS:
+        for heading in headings:
+            if heading.lower().split(' ', 1)[0] in HEADING_WORDS[scope]:
+                return heading
+    return None
+
+def applies(definition, section):
+    if definition['act'] != section['act']:
+        return False
+    if definition['scope'] in ('section', 'subsection'):
+        return definition['section'] == section['section']
+    if definition['scope_heading'] is not None:
+        return definition['scope_heading'] in section.get('headings', [])
+    return True
+
+def build_term_index(files, index_dir):
+    os.makedirs(index_dir, exist_ok=True)
+
+    # Pass 1: every definition in the corpus
+    definitions = []
+    for section in iter_sections(files):
+        for definition in section.get('definitions', []):
+            definitions.append({
+                'term': definition['term'],
+                'act': section['act'],
+                'section': section['section'],
+                'scope': definition['scope'],
+                'scope_heading': scope_heading(definition['scope'], section.get('headings', [])),
+                'text': definition['text'],
+            })
+    definitions.sort(key=lambda d: SCOPES.index(d['scope']))
+    by_term = {}
+    for definition in definitions:
+        by_term.setdefault(tuple(tokenize(definition['term'])), []).append(definition)
+    by_term.pop((), None)
+    patterns = list(by_term)
+    matcher = TermMatcher(patterns)
+
+    # Pass 2: one automaton scan per section, keeping the matches defined
+    # for that section (narrowest scope wins). A term in the wording of its
+    # own definition is not a use of it.
+    uses = 0
+    tmp = lambda name: os.path.join(index_dir, name + '.tmp')
+    with open(tmp('annotations.jsonl'), 'w', encoding='utf-8') as out:
+        for section in iter_sections(files):
+            counts = {}
+            for i in matcher.scan(tokenize(section['text'])):
+                counts[i] = counts.get(i, 0) + 1
+            for definition in section.get('definitions', []):
+                term = tuple(tokenize(definition['term']))
+                for i in matcher.scan(tokenize(definition['text'])):
+                    if patterns[i] == term and counts.get(i):
+                        counts[i] -= 1
+            used = []
+            for i, count in counts.items():
+                if not count:
+                    continue
+                definition = next((d for d in by_term[patterns[i]] if applies(d, section)), None)
+                if definition is not None:
+                    used.append([definition['term'], definition['section'], count])
+            uses += len(used)
+            out.write(json.dumps({'act': section['act'], 'section': section['section'], 'terms': used},
+                                 ensure_ascii=False) + '\n')
+    with open(tmp('terms.jsonl'), 'w', encoding='utf-8') as f:
+        for definition in definitions:
+            f.write(json.dumps(definition, ensure_ascii=False) + '\n')
+    for name in ('terms.jsonl', 'annotations.jsonl'):
+        os.replace(tmp(name), os.path.join(index_dir, name))
+    return {'definitions': len(definitions), 'terms': len(patterns), 'uses': uses}
+
+class TermIndex:
+    def __init__(self, index_dir):
+        self.by_term = {}
+        with open(os.path.join(index_dir, 'terms.jsonl'), encoding='utf-8') as f:
+            for line in f:
+                definition = json.loads(line)
+                self.by_term.setdefault(' '.join(tokenize(definition['term'])), []).append(definition)
+        self.annotations = {}
+        with open(os.path.join(index_dir, 'annotations.jsonl'), encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                self.annotations[(row['act'], row['section'])] = row['terms']
+
+    def define(self, term, act=None):
+        # Every definition of `term`, optionally only those of one act
+        return [d for d in self.by_term.get(' '.join(tokenize(term)), []) if act is None or d['act'] == act]
+
+    def used_in(self, act, section):
+        # [(term, defining section, uses)] for one section
+        return [tuple(use) for use in self.annotations.get((act, section), [])]
+
+def main():
+    parser = argparse.ArgumentParser(description="Defined-term index and term-usage annotations.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="index the definitions in every <act>.sections.jsonl in a directory")
+    build.add_argument('sections_dir')
+    build.add_argument('index_dir')
+    build.add_argument('--language', choices=LANGUAGES, default='eng',
+                       help="index the English sections, or the French ones (<act>.fra.sections.jsonl)")
+
+    define = sub.add_parser('define', help="where and how a term is defined")
+    define.add_argument('index_dir')
+    define.add_argument('term')
+    define.add_argument('--act', default=None)
+
+    used_in = sub.add_parser('used-in', help="the defined terms a section uses")
+    used_in.add_argument('index_dir')
+    used_in.add_argument('act')
+    used_in.add_argument('section')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        files = section_files(args.sections_dir, args.language)
+        if not files:
+            print(f"Error: no *.sections.jsonl files in '{args.sections_dir}'.")
+            return
+        start = time.perf_counter()
+        stats = build_term_index(files, args.index_dir)
+        print(f"{stats['definitions']} definitions, {stats['terms']} distinct terms, {stats['uses']} uses annotated "
+              f"in {time.perf_counter() - start:.1f}s")
+    elif args.command == 'define':
+        index = TermIndex(args.index_dir)
+        for d in index.define(args.term, args.act):
+            print(f"{d['act']} s. {d['section']} ({d['scope']}): {d['text']}")
+    else:
+        index = TermIndex(args.index_dir)
+        for term, section, count in index.used_in(args.act, args.section):
+            print(f"{term} (defined in s. {section}) x{count}")
+
+if __name__ == "__main__":
+    main()
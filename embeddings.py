@@ -0,0 +1,196 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import argparse
+import importlib
+import numpy as np
+
+from corpus import LANGUAGES, output_files
+
+# Embeds the chunks written by "XML to MD Scrapper v7.py --chunks" in large
+# batches and stores the vectors in one memory-mapped .npy matrix, with a
+# metadata table whose line i describes row i:
+#
+#   store/vectors.npy   (rows, dim) float32 or float16
+#   store/meta.jsonl    id, act, section, labels, headings, sha256 per row
+#   store/store.json    encoder name, dim, dtype, row count
+#
+# Vectors are keyed by the SHA-256 of the chunk text. On a rebuild, any
+# chunk whose text is already in the previous store (under the same
+# encoder) is copied across instead of being embedded again, as are
+# duplicate texts within one run.
+#
+#   python embeddings.py "md files" store --batch-size 1024 --dtype float16
+
+class HashingEncoder:
+    # Deterministic stand-in for a real embedding model: word unigrams and
+    # bigrams are hashed into `dim` buckets with a random sign (the
+    # "hashing trick"), weighted by log term frequency and L2-normalised.
+    # Needs nothing but NumPy and gives the same vector for the same text
+    # on every machine, which is enough to exercise the pipeline and for
+    # lexical-ish similarity.
+    token_re = re.compile(r"\w+")
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+        self._features = {}
+
+    def _feature(self, token):
+        feature = self._features.get(token)
+        if feature is None:
+            h = zlib.crc32(token.encode('utf-8'))
+            feature = self._features[token] = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+        return feature
+
+    def encode(self, texts):
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            tokens = self.token_re.findall(text.lower())
+            for token in tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]:
+                col, sign = self._feature(token)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)),
+                  np.array(signs, dtype=np.float32))
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+def load_encoder(spec, dim=384):
+    # "hashing" for the built-in encoder, or "package.module:factory" for
+    # anything else. The factory is called with no arguments and must
+    # return an object with .name, .dim and .encode(list_of_texts), the
+    # latter returning a (len(texts), dim) array.
+    if spec == 'hashing':
+        return HashingEncoder(dim)
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr)()
+
+def chunk_files(chunk_dir, language='eng'):
+    # One language per store; see corpus.py
+    return output_files(chunk_dir, 'chunks', language)
+
+def iter_chunk_records(files):
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def load_store(store_dir, mmap_mode='r'):
+    # -> (vectors, meta rows, store info). vectors is memory-mapped.
+    with open(os.path.join(store_dir, 'store.json'), encoding='utf-8') as f:
+        info = json.load(f)
+    vectors = np.load(os.path.join(store_dir, 'vectors.npy'), mmap_mode=mmap_mode)
+    with open(os.path.join(store_dir, 'meta.jsonl'), encoding='utf-8') as f:
+        meta = [json.loads(line) for line in f]
+    return vectors, meta, info
+
+def _previous_vectors(store_dir, encoder):
+    # sha256 -> row in the previous store, if it was built by this encoder
+    try:
+        old_vectors, old_meta, info = load_store(store_dir)
+    except (OSError, ValueError):
+        return None, {}
+    if info.get('encoder') != encoder.name or info.get('dim') != encoder.dim:
+        return None, {}
+    return old_vectors, {row['sha256']: i for i, row in enumerate(old_meta)}
+
+def build_store(files, store_dir, encoder, batch_size=1024, dtype='float32'):
+    os.makedirs(store_dir, exist_ok=True)
+
+    # Pass 1: metadata and content hashes only, so the matrix can be
+    # allocated at its final size before any vector is computed.
+    meta = []
+    for chunk in iter_chunk_records(files):
+        meta.append({
+            'id': chunk['id'],
+            'act': chunk['act'],
+            'section': chunk.get('section'),
+            'labels': chunk.get('labels', []),
+            'headings': chunk.get('headings', []),
+            'sha256': text_hash(chunk['text']),
+        })
+
+    old_vectors, old_rows = _previous_vectors(store_dir, encoder)
+    tmp_path = os.path.join(store_dir, 'vectors.npy.tmp')
+    vectors = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.dtype(dtype),
+                                        shape=(len(meta), encoder.dim))
+
+    # Pass 2: fill rows from the previous store where the text is unchanged,
+    # and embed the rest in batches. A text seen twice in this run is only
+    # embedded once; later rows copy it.
+    stats = {'rows': len(meta), 'reused': 0, 'embedded': 0, 'duplicates': 0}
+    first_row = {}
+    pending_rows, pending_texts = [], []
+    copies = []  # (row, earlier row with the same text)
+
+    def flush():
+        if pending_texts:
+            vectors[pending_rows] = np.asarray(encoder.encode(pending_texts), dtype=np.float32)
+            stats['embedded'] += len(pending_texts)
+            pending_rows.clear()
+            pending_texts.clear()
+
+    for row, chunk in enumerate(iter_chunk_records(files)):
+        sha = meta[row]['sha256']
+        if sha in first_row:
+            copies.append((row, first_row[sha]))
+            stats['duplicates'] += 1
+            continue
+        first_row[sha] = row
+        if sha in old_rows:
+            vectors[row] = old_vectors[old_rows[sha]]
+            stats['reused'] += 1
+            continue
+        pending_rows.append(row)
+        pending_texts.append(chunk['text'])
+        if len(pending_texts) >= batch_size:
+            flush()
+    flush()
+    for row, source_row in copies:
+        vectors[row] = vectors[source_row]
+    vectors.flush()
+    del vectors, old_vectors
+
+    # Swap the new store in only once it is complete
+    with open(os.path.join(store_dir, 'meta.jsonl.tmp'), 'w', encoding='utf-8') as f:
+        for row in meta:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    with open(os.path.join(store_dir, 'store.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump({'encoder': encoder.name, 'dim': encoder.dim, 'dtype': np.dtype(dtype).name,
+                   'count': len(meta)}, f, indent=1)
+    for name in ('vectors.npy', 'meta.jsonl', 'store.json'):
+        os.replace(os.path.join(store_dir, name + '.tmp'), os.path.join(store_dir, name))
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed statute chunks into a memory-mapped vector store.")
+    parser.add_argument('chunk_dir', help="directory holding the <act>.chunks.jsonl files")
+    parser.add_argument('store_dir', help="directory for vectors.npy, meta.jsonl and store.json")
+    parser.add_argument('--encoder', default='hashing', help="'hashing' or 'package.module:factory'")
+    parser.add_argument('--dim', type=int, default=384, help="dimension for the hashing encoder")
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+    parser.add_argument('--language', choices=LANGUAGES, default='eng',
+                        help="embed the English chunks, or the French ones (<act>.fra.chunks.jsonl)")
+    args = parser.parse_args()
+
+    files = chunk_files(args.chunk_dir, args.language)
+    if not files:
+        print(f"Error: no *.chunks.jsonl files in '{args.chunk_dir}'.")
+        return
+    stats = build_store(files, args.store_dir, load_encoder(args.encoder, args.dim), args.batch_size, args.dtype)
+    print(f"{stats['rows']} chunks: {stats['embedded']} embedded, {stats['reused']} reused, "
+          f"{stats['duplicates']} duplicates")
+
+if __name__ == "__main__":
+    main()
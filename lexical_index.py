@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from corpus import LANGUAGES, section_files, tokenize
+
+# BM25 index over the <act>.sections.jsonl files that
+# "XML to MD Scrapper v7.py --bm25 DIR" writes (one record per Section,
+# rendered by the converter's handlers). Postings are stored term-major in
+# flat NumPy arrays and memory-mapped at query time:
+#
+#   terms.json       term -> term ID
+#   offsets.npy      (terms + 1,) postings of term t are offsets[t]:offsets[t+1]
+#   postings.npy     (postings,) int32 doc ID, ascending within a term
+#   tfs.npy          (postings,) uint16 term frequency in that doc
+#   doc_lengths.npy  (docs,) int32 tokens per doc
+#   docs.jsonl       act, section, marginal note per doc ID
+#   index.json       doc count, average doc length
+#
+#   python lexical_index.py build "md files" bm25
+#   python lexical_index.py search bm25 "designated person" -k 10
+
+def build_index(files, index_dir):
+    os.makedirs(index_dir, exist_ok=True)
+    vocabulary = {}
+    term_ids, doc_ids, tfs, doc_lengths = [], [], [], []
+    tmp = lambda name: os.path.join(index_dir, name + '.tmp')
+
+    with open(tmp('docs.jsonl'), 'w', encoding='utf-8') as docs:
+        for path in files:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    section = json.loads(line)
+                    doc = len(doc_lengths)
+                    tokens = tokenize(section['text'])
+                    counts = {}
+                    for token in tokens:
+                        counts[token] = counts.get(token, 0) + 1
+                    for token, tf in counts.items():
+                        term = vocabulary.get(token)
+                        if term is None:
+                            term = vocabulary[token] = len(vocabulary)
+                        term_ids.append(term)
+                        tfs.append(tf)
+                    doc_ids.extend([doc] * len(counts))
+                    doc_lengths.append(len(tokens))
+                    docs.write(json.dumps({'act': section['act'], 'section': section['section'],
+                                           'marginal_note': section.get('marginal_note')},
+                                          ensure_ascii=False) + '\n')
+
+    # Group postings by term; the stable sort keeps doc IDs ascending
+    term_ids = np.array(term_ids, dtype=np.int32)
+    order = np.argsort(term_ids, kind='stable')
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+    arrays = {
+        'offsets.npy': offsets,
+        'postings.npy': np.array(doc_ids, dtype=np.int32)[order],
+        'tfs.npy': np.minimum(np.array(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+        'doc_lengths.npy': np.array(doc_lengths, dtype=np.int32),
+    }
+    for name, array in arrays.items():
+        with open(tmp(name), 'wb') as f:
+            np.save(f, array)
+    with open(tmp('terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f, ensure_ascii=False)
+    with open(tmp('index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'docs': len(doc_lengths), 'terms': len(vocabulary), 'postings': len(order),
+                   'avg_doc_length': float(np.mean(doc_lengths)) if doc_lengths else 0.0}, f, indent=1)
+    # Swap the new index in only once it is complete
+    for name in list(arrays) + ['terms.json', 'docs.jsonl', 'index.json']:
+        os.replace(tmp(name), os.path.join(index_dir, name))
+    return {'docs': len(doc_lengths), 'terms': len(vocabulary), 'postings': len(order)}
+
+class BM25Index:
+    def __init__(self, index_dir, k1=1.2, b=0.75):
+        self.k1, self.b = k1, b
+        path = lambda name: os.path.join(index_dir, name)
+        with open(path('index.json'), encoding='utf-8') as f:
+            self.info = json.load(f)
+        with open(path('terms.json'), encoding='utf-8') as f:
+            self.terms = json.load(f)
+        with open(path('docs.jsonl'), encoding='utf-8') as f:
+            self.docs = [json.loads(line) for line in f]
+        self.offsets = np.load(path('offsets.npy'), mmap_mode='r')
+        self.postings = np.load(path('postings.npy'), mmap_mode='r')
+        self.tfs = np.load(path('tfs.npy'), mmap_mode='r')
+        # Per-doc length normalisation is the same for every query
+        doc_lengths = np.load(path('doc_lengths.npy'))
+        self.norms = (k1 * (1 - b + b * doc_lengths / max(self.info['avg_doc_length'], 1e-9))).astype(np.float32)
+
+    def search(self, query, k=10):
+        # -> [(score, doc ID)], best first
+        n = self.info['docs']
+        scores = np.zeros(n, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            idf = np.log1p((n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self.norms[docs])
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[doc]), int(doc)) for doc in top]
+
+    def citation(self, doc):
+        return self.docs[doc]
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 index over converted statute sections.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="index every <act>.sections.jsonl in a directory")
+    build.add_argument('sections_dir')
+    build.add_argument('index_dir')
+    build.add_argument('--language', choices=LANGUAGES, default='eng',
+                       help="index the English sections, or the French ones (<act>.fra.sections.jsonl)")
+
+    search = sub.add_parser('search', help="top-k sections for a query")
+    search.add_argument('index_dir')
+    search.add_argument('query')
+    search.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        files = section_files(args.sections_dir, args.language)
+        if not files:
+            print(f"Error: no *.sections.jsonl files in '{args.sections_dir}'.")
+            return
+        start = time.perf_counter()
+        stats = build_index(files, args.index_dir)
+        print(f"{stats['docs']} sections, {stats['terms']} terms, {stats['postings']} postings "
+              f"in {time.perf_counter() - start:.1f}s")
+    else:
+        index = BM25Index(args.index_dir)
+        start = time.perf_counter()
+        hits = index.search(args.query, args.k)
+        elapsed = time.perf_counter() - start
+        for score, doc in hits:
+            cite = index.citation(doc)
+            note = f"  {cite['marginal_note']}" if cite['marginal_note'] else ''
+            print(f"{score:7.3f}  {cite['act']} s. {cite['section']}{note}")
+        print(f"{len(hits)} hits in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+import http.server
+from email.utils import formatdate
+
+import pytest
+
+# A local stand-in for laws-lois.justice.gc.ca: serves `documents`
+# ({path: bytes}) over keep-alive HTTP/1.1 with an ETag and Last-Modified
+# per document, answers conditional GETs with 304 and anything else with
+# 404, and records every request it answers.
+
+class LawsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, body):
+        path = self.path
+        data = self.server.documents.get(path)
+        if data is None:
+            self.server.requests.append((self.command, path, 404))
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.server.requests.append((self.command, path, 304))
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.server.requests.append((self.command, path, 200))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(self.server.modified, usegmt=True))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+class LawsServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), LawsHandler)
+        self.documents = {}
+        self.requests = []
+        self.connections = 0
+        self.modified = 1_500_000_000
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def gets(self, status=None):
+        # Paths of the GETs answered (with `status`, if given)
+        return [path for method, path, code in self.requests
+                if method == 'GET' and (status is None or code == status)]
+
+@pytest.fixture
+def laws_server():
+    server = LawsServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def statute(number, sections, title='An Act respecting testing'):
+    # A small act in the laws-lois XML schema. `sections` are the inner XML
+    # of each Body element in turn: Section and Heading markup.
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Statute xmlns:lims="http://justice.gc.ca/lims" lims:id="1">'
+            f'<Identification><LongTitle>{title}</LongTitle>'
+            f'<ShortTitle status="official">Testing Act</ShortTitle>'
+            f'<Chapter><ConsolidatedNumber official="yes">{number}</ConsolidatedNumber></Chapter>'
+            f'</Identification><Body>{"".join(sections)}</Body></Statute>').encode('utf-8')
+
+def section(label, text, note='Purpose'):
+    return f'<Section><Label>{label}</Label><MarginalNote>{note}</MarginalNote><Text>{text}</Text></Section>'
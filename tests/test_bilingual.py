@@ -0,0 +1,52 @@
+import pytest
+
+import xml_to_md
+from conftest import statute, section
+
+# A-1 and the regulation have French versions, A-2 has none (404)
+DOCUMENTS = {
+    '/eng/XML/A-1.xml': statute('A-1', [section('1', 'A person shall comply.')]),
+    '/fra/XML/A-1.xml': statute('A-1', [section('1', 'Toute personne doit se conformer.', 'Objet')]),
+    '/eng/XML/A-2.xml': statute('A-2', [section('1', 'Another rule.')]),
+    '/eng/XML/SOR-2000-1.xml': statute('SOR/2000-1', [section('1', 'A regulation.')]),
+    '/fra/XML/DORS-2000-1.xml': statute('DORS/2000-1', [section('1', 'Un règlement.', 'Objet')]),
+}
+
+@pytest.mark.parametrize('link, expected', [
+    ('https://laws-lois.justice.gc.ca/eng/XML/A-1.xml', 'https://laws-lois.justice.gc.ca/fra/XML/A-1.xml'),
+    ('https://laws-lois.justice.gc.ca/eng/XML/SOR-2000-1.xml',
+     'https://laws-lois.justice.gc.ca/fra/XML/DORS-2000-1.xml'),
+    ('https://laws-lois.justice.gc.ca/eng/XML/SI-2000-1.xml', 'https://laws-lois.justice.gc.ca/fra/XML/TR-2000-1.xml'),
+    ('https://laws-lois.justice.gc.ca/eng/XML/C.R.C.,_c._870.xml',
+     'https://laws-lois.justice.gc.ca/fra/XML/C.R.C.,_ch._870.xml'),
+    ('https://example.com/acts/A-1.xml', None),
+])
+def test_french_link(link, expected):
+    assert xml_to_md.french_link(link) == expected
+
+def test_acts_without_a_french_version_stay_unchanged(laws_server, tmp_path, capsys):
+    laws_server.documents.update(DOCUMENTS)
+    csv_file = tmp_path / 'acts.csv'
+    csv_file.write_text('xml_link\n' + ''.join(laws_server.url(path) + '\n'
+                                               for path in sorted(DOCUMENTS) if path.startswith('/eng/')))
+    output_dir = tmp_path / 'md'
+
+    def sync():
+        xml_to_md.main(str(csv_file), str(output_dir), concurrency=2, processes=1, bilingual=True, retries=0)
+        return capsys.readouterr().out
+
+    assert 'Rebuilt 5 acts' in sync()
+    assert (output_dir / 'A-1.aligned.jsonl').exists() and (output_dir / 'SOR-2000-1.aligned.jsonl').exists()
+    assert (output_dir / 'SOR-2000-1.fra.md').exists()
+    assert not (output_dir / 'A-2.aligned.jsonl').exists() and (output_dir / 'A-2.md').exists()
+
+    # The missing French version is a failed download each run, but the
+    # English act it would pair with is not rebuilt for it
+    out = sync()
+    assert 'Rebuilt 0 acts, 5 unchanged' in out and '1 acts failed' in out
+
+    # Once there is one, it is paired with the English act already on disk
+    laws_server.documents['/fra/XML/A-2.xml'] = statute('A-2', [section('1', 'Une autre règle.', 'Objet')])
+    assert 'Rebuilt 1 acts, 5 unchanged' in sync()
+    assert (output_dir / 'A-2.fra.md').exists() and (output_dir / 'A-2.aligned.jsonl').exists()
+    assert 'Rebuilt 0 acts, 6 unchanged' in sync()
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+import bundle
+import xml_to_md
+from conftest import statute, section
+
+FRENCH = statute('A-1', [
+    '<Heading level="2"><Label>PARTIE 1</Label><TitleText>Dispositions générales</TitleText></Heading>',
+    section(1, 'Loi sur la sécurité des bâtiments « édifiés » à Montréal.', 'Titre abrégé'),
+    section(2, 'Le ministre désigné — ou son délégué — reçoit l’avis.', 'Désignation'),
+    '<Heading level="2"><Label>PARTIE 2</Label><TitleText>Façades</TitleText></Heading>',
+    section(3, 'Unités : 5 m², 3 °C, ∑ des coûts, 𝔸-classe.', 'Unités'),
+], title='Loi concernant les édifices')
+ENGLISH = statute('B-2', [section(1, 'Short title.'), section(2, 'Application.')])
+
+def converted(xml, act_id):
+    result = xml_to_md.convert_act(xml, act_id, {'streaming': True, 'parser': 'stdlib', 'section_spans': True})
+    return result['md'], result['section_spans']
+
+def expected_sections(xml):
+    # Each Section rendered on its own
+    root = xml_to_md.parse_xml(xml)
+    body = root.find('Body')
+    return {elem.find('Label').text: xml_to_md.render_element(elem, body) for elem in body.findall('Section')}
+
+def test_sections_of_non_ascii_acts(tmp_path):
+    path = str(tmp_path / 'acts.bundle')
+    writer = bundle.BundleWriter(path)
+    for xml, act in ((FRENCH, 'A-1'), (ENGLISH, 'B-2')):
+        md, spans = converted(xml, act)
+        writer.add_text(act, md, spans)
+    writer.close()
+
+    with bundle.Bundle(path) as packed:
+        assert packed.acts() == ['A-1', 'B-2']
+        for xml, act in ((FRENCH, 'A-1'), (ENGLISH, 'B-2')):
+            assert packed.text(act) == xml_to_md.xml_bytes_to_md(xml)
+            sections = expected_sections(xml)
+            assert [key for key, _, _ in packed.section_entries(act)] == [f'{act}/{label}' for label in sections]
+            for label, text in sections.items():
+                assert packed.text(act, label) == text
+        assert packed.text('A-1', '3').startswith('#### 3. Unités\n')
+
+def test_copy_keeps_section_spans(tmp_path):
+    old_path, new_path = str(tmp_path / 'old.bundle'), str(tmp_path / 'new.bundle')
+    writer = bundle.BundleWriter(old_path)
+    writer.add_text('B-2', *converted(ENGLISH, 'B-2'))
+    writer.add_text('A-1', *converted(FRENCH, 'A-1'))
+    writer.close()
+
+    with bundle.Bundle(old_path) as old:
+        writer = bundle.BundleWriter(new_path)
+        writer.add_text('C-3', 'é' * 1001)
+        writer.copy(old, 'A-1')
+        writer.close()
+    with bundle.Bundle(new_path) as new:
+        for label, text in expected_sections(FRENCH).items():
+            assert new.text('A-1', label) == text
+
+def test_utf8_spans():
+    rng = random.Random(1)
+    alphabet = 'aé€𝔸 \n'
+    for _ in range(50):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        spans = {}
+        for n in range(rng.randint(0, 5)):
+            start = rng.randint(0, len(text))
+            spans[str(n)] = (start, rng.randint(start, len(text)))
+        encoded = text.encode('utf-8')
+        for label, (start, end) in bundle.utf8_spans(text, spans).items():
+            assert encoded[start:end].decode('utf-8') == text[slice(*spans[label])]
+
+def test_duplicate_entry_is_refused(tmp_path):
+    writer = bundle.BundleWriter(str(tmp_path / 'dup.bundle'))
+    writer.add_text('A-1', 'one')
+    with pytest.raises(ValueError):
+        writer.add_text('A-1', 'two')
+    writer.close()
+
+@pytest.mark.parametrize('size', [0, 7, 40])
+def test_incomplete_bundle_is_refused(tmp_path, size):
+    # A write that never reached close()
+    path = str(tmp_path / 'acts.bundle')
+    writer = bundle.BundleWriter(path)
+    writer.add_text('A-1', 'x' * 100)
+    writer.f.close()
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+    with pytest.raises(ValueError):
+        bundle.Bundle(path)
@@ -0,0 +1,56 @@
+import io
+import itertools
+
+import pytest
+
+import benchmark
+import xml_to_md
+from conftest import statute, section
+
+def words(n):
+    return ' '.join(['word'] * n)
+
+RULES = statute('C-1', [
+    '<Heading level="1"><Label>PART 1</Label><TitleText>General</TitleText></Heading>',
+    section('1', 'Short.'),
+    '<Heading level="2"><TitleText>Rules</TitleText></Heading>',
+    '<Section><Label>2</Label><MarginalNote>Rule</MarginalNote>'
+    f'<Subsection><Label>(1)</Label><Text>{words(30)}</Text>'
+    f'<Paragraph><Label>(a)</Label><Text>{words(40)}</Text></Paragraph>'
+    f'<Paragraph><Label>(b)</Label><Text>{words(40)}</Text>'
+    f'<Subparagraph><Label>(i)</Label><Text>{words(200)}</Text></Subparagraph></Paragraph></Subsection>'
+    f'<Subsection><Label>(2)</Label><Text>{words(10)}</Text></Subsection></Section>',
+])
+
+def test_chunks_split_along_the_structure():
+    chunks = list(xml_to_md.iter_chunks(io.BytesIO(RULES), max_tokens=100))
+    assert [c['id'] for c in chunks] == [f'C-1:{i}' for i in range(5)]
+    assert [c['labels'] for c in chunks] == [['1'], ['2', '2(1)', '2(1)(a)'], ['2(1)(b)'], ['2(1)(b)(i)'], ['2(2)']]
+    assert [c['headings'] for c in chunks] == [['PART 1 General']] + [['PART 1 General', 'Rules']] * 4
+    assert {c['act'] for c in chunks} == {'C-1'} and {c['section'] for c in chunks[1:]} == {'2'}
+    assert chunks[1]['text'] == f"#### 2. Rule\n##### (1) \n{words(30)}\n\t- (a) {words(40)}\n"
+    # A provision over the budget is a chunk of its own, never cut
+    assert chunks[3]['text'] == f"\t\t- (i) {words(200)}\n" and chunks[3]['tokens'] > 100
+
+@pytest.mark.parametrize('max_tokens', [40, 120, 400])
+def test_chunk_boundaries_fall_between_provisions(max_tokens):
+    xml = benchmark.generate_statute(40, seed=11)
+    chunks = list(xml_to_md.iter_chunks(io.BytesIO(xml), max_tokens=max_tokens))
+    provisions = list(xml_to_md.iter_provisions(io.BytesIO(xml)))
+    assert ''.join(c['text'] for c in chunks) == ''.join(text for _, text in provisions)
+
+    # Where each provision ends in the text of all sections. A chunk is a
+    # run of whole provisions; its labels are the paths of the units it
+    # was packed from, which cover those provisions.
+    ends = list(itertools.accumulate(len(text) for _, text in provisions))
+    boundaries = set(ends)
+    position = 0
+    for chunk in chunks:
+        start, position = position, position + len(chunk['text'])
+        assert position in boundaries
+        covered = [path for (path, _), end in zip(provisions, ends) if start < end <= position]
+        assert set(chunk['labels']) <= set(covered) and covered[0] == chunk['labels'][0]
+        assert all(any(path.startswith(label) for label in chunk['labels']) for path in covered)
+        assert all(label.startswith(chunk['section']) for label in chunk['labels'])
+        # Over budget only when a single provision is
+        assert chunk['tokens'] <= max_tokens or len(covered) == 1
@@ -0,0 +1,13 @@
+import pytest
+
+import xml_to_md_cli
+from conftest import statute, section
+
+@pytest.mark.parametrize('command', [['convert'], ['convert', '--streaming'], ['chunk']])
+def test_exit_status(tmp_path, command):
+    good, bad = tmp_path / 'A-1.xml', tmp_path / 'B-2.xml'
+    good.write_bytes(statute('A-1', [section('1', 'A person shall comply.')]))
+    bad.write_bytes(b'<Statute><Body><Section>')
+    output = str(tmp_path / 'out')
+    assert xml_to_md_cli.main([command[0], str(good), '-o', output, *command[1:]]) == 0
+    assert xml_to_md_cli.main([command[0], str(bad), '-o', output, *command[1:]]) == 1
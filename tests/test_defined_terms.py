@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import random
+import subprocess
+
+import pytest
+
+import defined_terms
+import xml_to_md
+from corpus import tokenize
+
+def brute_force(patterns, tokens):
+    # (end position, pattern index) of every occurrence
+    return sorted((end, i) for i, pattern in enumerate(patterns)
+                  for end in range(len(pattern), len(tokens) + 1)
+                  if tuple(tokens[end - len(pattern):end]) == pattern)
+
+def test_overlapping_and_nested_matches():
+    # The classic Aho-Corasick case: failure links must carry "he" out of "she"
+    patterns = [('he',), ('she',), ('his',), ('hers',), ('she', 'he'), ('he', 'hers')]
+    matcher = defined_terms.TermMatcher(patterns)
+    tokens = ['ushers', 'she', 'he', 'hers', 'his']
+    found = sorted(matcher.scan(tokens))
+    assert found == sorted(i for _, i in brute_force(patterns, tokens))
+    assert sorted(found) == [0, 1, 2, 3, 4, 5]
+
+def test_matches_whole_words_only():
+    matcher = defined_terms.TermMatcher([tuple(tokenize('designated person')), tuple(tokenize('person'))])
+    assert list(matcher.scan(tokenize('A designated person, or any person.'))) == [0, 1, 1]
+    assert list(matcher.scan(tokenize('designated personnel'))) == []
+
+@pytest.mark.parametrize('seed', range(20))
+def test_agrees_with_brute_force(seed):
+    rng = random.Random(seed)
+    alphabet = ['a', 'b', 'c', 'd']
+    patterns = list({tuple(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(12)})
+    tokens = [rng.choice(alphabet) for _ in range(200)]
+    matcher = defined_terms.TermMatcher(patterns)
+    assert sorted(matcher.scan(tokens)) == sorted(i for _, i in brute_force(patterns, tokens))
+
+def write_sections(path, sections):
+    with open(path, 'w', encoding='utf-8') as f:
+        for section in sections:
+            f.write(json.dumps(section) + '\n')
+
+def record(act, label, text, headings=(), definitions=()):
+    # `definitions` are (term, scope, wording), the wording part of `text`
+    return {'act': act, 'section': label, 'headings': list(headings), 'text': text,
+            'definitions': [{'term': term, 'scope': scope, 'text': wording} for term, scope, wording in definitions]}
+
+def test_definitions_apply_within_their_scope(tmp_path):
+    write_sections(tmp_path / 'A-1.sections.jsonl', [
+        record('A-1', '2', 'Definitions. A court is a court of law.',
+               definitions=[('court', 'act', 'A court is a court of law.')]),
+        record('A-1', '10', 'In this Part, vessel means a ship.', ['PART 1 Shipping'],
+               definitions=[('vessel', 'part', 'vessel means a ship.')]),
+        record('A-1', '11', 'A vessel must be registered with the court.', ['PART 1 Shipping']),
+        record('A-1', '20', 'A vessel in another Part; the court decides.', ['PART 2 Other']),
+        record('A-1', '21', 'For this section, court means a judge. The court may act.', ['PART 2 Other'],
+               definitions=[('court', 'section', 'court means a judge.')]),
+    ])
+    write_sections(tmp_path / 'B-2.sections.jsonl', [
+        record('B-2', '1', 'Neither the court nor a vessel is defined in this act.'),
+    ])
+    files = [str(tmp_path / 'A-1.sections.jsonl'), str(tmp_path / 'B-2.sections.jsonl')]
+    stats = defined_terms.build_term_index(files, str(tmp_path / 'terms'))
+    assert stats == {'definitions': 3, 'terms': 2, 'uses': 4}
+
+    index = defined_terms.TermIndex(str(tmp_path / 'terms'))
+    assert index.used_in('A-1', '11') == [('vessel', '10', 1), ('court', '2', 1)]
+    # Out of Part 1, "vessel" is an ordinary word
+    assert index.used_in('A-1', '20') == [('court', '2', 1)]
+    # The section's own definition beats the act-wide one, and its wording
+    # is not a use of the term it defines
+    assert index.used_in('A-1', '21') == [('court', '21', 1)]
+    assert index.used_in('A-1', '2') == [] and index.used_in('A-1', '10') == []
+    # Definitions never cross acts
+    assert index.used_in('B-2', '1') == []
+    assert [d['scope'] for d in index.define('Court')] == ['section', 'act']
+    assert index.define('vessel', act='B-2') == []
+
+@pytest.mark.parametrize('lead_in, scope', [
+    ('The following definitions apply in this Act.', 'act'),
+    ('The following definitions apply in these Regulations.', 'act'),
+    ('In this Part,', 'part'),
+    ('The following definitions apply in this section.', 'section'),
+    ("Les définitions qui suivent s'appliquent à la présente loi.", 'act'),
+    ('Les définitions qui suivent s’appliquent au présent règlement.', 'act'),
+    ('Dans la présente partie :', 'part'),
+    ("Les définitions qui suivent s'appliquent à la présente section.", 'division'),
+    ("Les définitions qui suivent s'appliquent à la présente sous-section.", 'subdivision'),
+    ("Les définitions qui suivent s'appliquent au présent article.", 'section'),
+    ("Les définitions qui suivent s'appliquent au présent paragraphe.", 'subsection'),
+    ('Definitions', 'act'),
+])
+def test_definition_scope_in_either_language(lead_in, scope):
+    assert xml_to_md.definition_scope(lead_in) == scope
+
+def test_french_part_definitions_apply_under_their_heading(tmp_path):
+    write_sections(tmp_path / 'A-1.fra.sections.jsonl', [
+        record('A-1', '10', 'Dans la présente partie, navire signifie un bâtiment.', ['PARTIE 1 Navigation'],
+               definitions=[('navire', 'part', 'navire signifie un bâtiment.')]),
+        record('A-1', '11', 'Le navire est immatriculé.', ['PARTIE 1 Navigation']),
+        record('A-1', '20', 'Un navire dans une autre partie.', ['PARTIE 2 Autre']),
+    ])
+    defined_terms.build_term_index([str(tmp_path / 'A-1.fra.sections.jsonl')], str(tmp_path / 'terms'))
+    index = defined_terms.TermIndex(str(tmp_path / 'terms'))
+    assert index.define('navire')[0]['scope_heading'] == 'PARTIE 1 Navigation'
+    assert index.used_in('A-1', '11') == [('navire', '10', 1)]
+    assert index.used_in('A-1', '20') == []
+
+def test_does_not_import_numpy():
+    code = 'import sys, defined_terms; sys.exit("numpy" in sys.modules)'
+    repo = os.path.dirname(os.path.abspath(defined_terms.__file__))
+    assert subprocess.run([sys.executable, '-c', code], cwd=repo).returncode == 0
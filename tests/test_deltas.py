@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import xml_to_md
+from conftest import statute, section
+
+def act(definition='means a day other than', formula='A × B', spacing=' '):
+    return statute('D-1', [
+        section('1', 'A person shall comply.'),
+        '<Section><Label>2</Label><MarginalNote>Definitions</MarginalNote>'
+        '<Subsection><Label>(1)</Label><Text>The following definitions apply in this section.</Text>'
+        f'<Definition><Text><DefinedTermEn>holiday</DefinedTermEn>{spacing}{definition} '
+        '(<DefinedTermFr>jour férié</DefinedTermFr>)</Text>'
+        '<Paragraph><Label>(a)</Label><Text>a Saturday; or</Text></Paragraph></Definition></Subsection>'
+        '<Subsection><Label>(2)</Label><Text>A holiday is not a day.</Text></Subsection></Section>',
+        '<Section><Label>3</Label><MarginalNote>Amount</MarginalNote><Text>The amount is</Text>'
+        f'<FormulaGroup><Formula><FormulaText>{formula}</FormulaText></Formula></FormulaGroup></Section>',
+    ])
+
+def fingerprints(xml, streaming=False):
+    options = {'streaming': streaming, 'parser': 'stdlib', 'deltas': True}
+    return xml_to_md.convert_act(xml, 'D-1', options)['fingerprints']
+
+@pytest.mark.parametrize('streaming', [False, True], ids=['tree', 'streaming'])
+def test_definition_amendment_is_modified(tmp_path, streaming):
+    output = str(tmp_path / 'D-1.md')
+    first = xml_to_md.write_deltas(output, fingerprints(act(), streaming), run='1')
+    assert first['added'] == ['1', '2', '2(1)', '2(2)', '3'] and not first['modified']
+
+    changes = xml_to_md.write_deltas(output, fingerprints(act('means any day except'), streaming), run='2')
+    assert changes == {'act': 'D-1', 'language': 'eng', 'run': '2', 'added': [], 'removed': [],
+                       'modified': ['2', '2(1)']}
+    with open(xml_to_md.changes_path(output), encoding='utf-8') as f:
+        assert json.load(f) == changes
+
+def test_changes_the_markdown_does_not_show():
+    # The formula is not rendered, but it is part of the provision
+    old, new = act(), act(formula='A × B × C')
+    assert xml_to_md.xml_bytes_to_md(old) == xml_to_md.xml_bytes_to_md(new)
+    assert xml_to_md.section_changes(fingerprints(old), fingerprints(new))['modified'] == ['3']
+
+def test_reformatting_is_not_a_change():
+    assert fingerprints(act()) == fingerprints(act(spacing='\n   '))
+    assert fingerprints(act()) == fingerprints(act(), streaming=True)
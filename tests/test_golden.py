@@ -0,0 +1,118 @@
+import io
+import difflib
+
+import pytest
+
+import benchmark
+import xml_to_md
+from conftest import statute, section
+
+# xml_to_md.py against the v7 converter it replaced, kept in
+# "XML to MD Scrapper v7.py". The fixture puts the elements v7 renders
+# under parents it never looked in: Definitions in a Subsection, Paragraphs
+# in a FormulaDefinition, Sections in a Schedule.
+BASELINE = statute('G-1', [
+    '<Heading level="2"><Label>PART 1</Label><TitleText>General</TitleText></Heading>',
+    section('1', 'This Act may be cited as the Testing Act.', 'Short title'),
+    '<Section><Label>2</Label><MarginalNote>Definitions</MarginalNote>'
+    '<Subsection><Label>(1)</Label><MarginalNote>Definitions</MarginalNote>'
+    '<Text>The following definitions apply in this section.</Text>'
+    '<Definition><Text><DefinedTermEn>holiday</DefinedTermEn> means a day other than '
+    '(<DefinedTermFr>jour férié</DefinedTermFr>)</Text>'
+    '<Paragraph><Label>(a)</Label><Text>a Saturday; or</Text></Paragraph>'
+    '<Paragraph><Label>(b)</Label><Text>a Sunday. (<DefinedTermFr>x</DefinedTermFr>)</Text></Paragraph>'
+    '</Definition>'
+    '<Definition><Text><DefinedTermEn>day</DefinedTermEn> means a clear day; '
+    '(<DefinedTermFr>jour</DefinedTermFr>)</Text></Definition>'
+    '<HistoricalNote><HistoricalNoteSubItem>2001, c. 1</HistoricalNoteSubItem></HistoricalNote>'
+    '</Subsection>'
+    '<Subsection><Label>(2)</Label><Text>A holiday is not a day.</Text>'
+    '<ContinuedSectionSubsection><Text>Nor is it a night.</Text></ContinuedSectionSubsection></Subsection>'
+    '</Section>',
+    '<Section><Label>3</Label><MarginalNote>Amount</MarginalNote>'
+    '<Text>The amount payable is determined by the formula</Text>'
+    '<FormulaGroup><Formula><FormulaText>A × B</FormulaText></Formula>'
+    '<FormulaConnector>where</FormulaConnector>'
+    '<FormulaDefinition><FormulaTerm>A</FormulaTerm><Text>is the greater of</Text>'
+    '<Paragraph><Label>(a)</Label><Text>the amount for the year, and</Text>'
+    '<Subparagraph><Label>(i)</Label><Text>in no case less than zero</Text></Subparagraph></Paragraph>'
+    '</FormulaDefinition></FormulaGroup>'
+    '<Paragraph><Label>(a)</Label><Text>in <Emphasis style="italic">every</Emphasis> case,</Text>'
+    '<Subparagraph><Label>(i)</Label><Text>first,</Text>'
+    '<Clause><Label>(A)</Label><Text>one</Text></Clause>'
+    '<ContinuedSubparagraph><Text>and then</Text></ContinuedSubparagraph></Subparagraph>'
+    '<ContinuedParagraph><Text>after all.</Text></ContinuedParagraph></Paragraph>'
+    '</Section>',
+    '<Section><Label>4</Label><MarginalNote>Definitions</MarginalNote>'
+    '<Text>The following definitions apply in this Act.</Text>'
+    '<Definition><Text><DefinedTermEn>court</DefinedTermEn> means a court; '
+    '(<DefinedTermFr>tribunal</DefinedTermFr>)</Text></Definition></Section>',
+]).replace(b'</Body>', b'</Body><Schedule><ScheduleFormHeading><Label>SCHEDULE</Label>'
+           b'<TitleText>Amending provisions</TitleText></ScheduleFormHeading>'
+           b'<BillPiece><Section><Label>1</Label><Text>The Act is amended.</Text>'
+           b'<Subsection><Label>(1)</Label><Text>By adding the following.</Text></Subsection>'
+           b'</Section></BillPiece></Schedule>')
+
+# What xml_to_md adds to v7's output on purpose: the Subsection's
+# definitions, which v7 dropped
+SUBSECTION_DEFINITIONS = [
+    '- **holiday**means a day other than\n',
+    '\t- (a) a Saturday; or\n',
+    '\t- (b) a Sunday.\n',
+    '- **day**means a clear day;\n',
+]
+
+DOCUMENTS = {
+    'baseline': BASELINE,
+    'synthetic': benchmark.generate_statute(60, seed=5),
+}
+
+@pytest.fixture(scope='module')
+def v7():
+    return benchmark.load_version('v7')
+
+def render_v7(v7, xml, tmp_path):
+    path = tmp_path / 'act.xml'
+    path.write_bytes(xml)
+    v7.xml_to_md(path.as_uri(), str(tmp_path / 'act.md'))
+    return (tmp_path / 'act.md').read_text(encoding='utf-8')
+
+def added_lines(old, new):
+    # The lines `new` adds to `old`; fails if it changes or drops any
+    old, new = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    added = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        assert tag in ('equal', 'insert'), ''.join(difflib.unified_diff(old, new, 'v7', 'xml_to_md'))
+        if tag == 'insert':
+            added.extend(new[j1:j2])
+    return added
+
+@pytest.mark.parametrize('document', sorted(DOCUMENTS))
+def test_registry_renders_like_v7(v7, document, tmp_path):
+    expected = render_v7(v7, DOCUMENTS[document], tmp_path)
+    md = xml_to_md.xml_bytes_to_md(DOCUMENTS[document])
+    assert added_lines(expected, md) == (SUBSECTION_DEFINITIONS if document == 'baseline' else [])
+
+def test_unregistered_containers_are_skipped():
+    md = xml_to_md.xml_bytes_to_md(BASELINE)
+    # Nothing from the FormulaDefinition or the Schedule, not even the
+    # lines of the Paragraphs and Sections inside them
+    assert 'the amount for the year' not in md and 'in no case' not in md
+    assert 'The Act is amended' not in md and 'By adding' not in md
+
+@pytest.mark.parametrize('document', sorted(DOCUMENTS))
+def test_streaming_renders_like_tree_and_v7(v7, document, tmp_path):
+    # iterparse hands the handlers one top-level element at a time, Body's
+    # children one by one and the Schedule whole, which must come out the
+    # same as rendering the parsed tree and as v7
+    xml = DOCUMENTS[document]
+    tree = xml_to_md.xml_bytes_to_md(xml)
+    assert xml_to_md.xml_bytes_to_md(xml, streaming=True) == tree
+    assert ''.join(xml_to_md.iter_md(io.BytesIO(xml))) == tree
+    source, output = tmp_path / 'streamed.xml', tmp_path / 'streamed.md'
+    source.write_bytes(xml)
+    assert xml_to_md.xml_to_md(str(source), str(output), streaming=True)
+    streamed = output.read_text(encoding='utf-8')
+    assert streamed == tree
+    expected = render_v7(v7, xml, tmp_path)
+    assert added_lines(expected, streamed) == (SUBSECTION_DEFINITIONS if document == 'baseline' else [])
@@ -0,0 +1,112 @@
+import os
+import json
+
+import pytest
+
+import xml_to_md
+from conftest import statute, section
+
+def test_interrupted_journal_lists_settled_acts(tmp_path):
+    path = str(tmp_path / '.sync-journal.jsonl')
+    journal = xml_to_md.SyncJournal(path)
+    assert journal.interrupted() is None
+    journal.open()
+    journal.settle('out/A-1.md', 'done', {'sha256': 'a'})
+    journal.settle('out/A-2.md', 'unchanged', {'sha256': 'b'})
+    journal.settle('out/A-3.md', 'done', {'sha256': 'c'})
+    journal.fail('out/A-3.md', 'write', OSError('disk full'))
+    journal.fail('out/A-4.md', 'convert', ValueError('bad XML'))
+    journal.close(complete=False)
+    # The record being written when the process was killed
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"act": "A-5.md", "sta')
+
+    resumed = xml_to_md.SyncJournal(path)
+    settled = resumed.interrupted()
+    assert sorted(settled) == ['A-1.md', 'A-2.md']
+    assert settled['A-2.md']['entry'] == {'sha256': 'b'}
+
+    # A resumed sync keeps the name of the one it resumes
+    resumed.open(resume=True)
+    assert resumed.run == journal.run
+    resumed.close(complete=True)
+    assert xml_to_md.SyncJournal(path).interrupted() is None
+    with open(path, encoding='utf-8') as f:
+        assert [json.loads(line).get('event') for line in f.readlines()[-2:]] == ['resume', 'end']
+
+ACTS = {f'/eng/XML/A-{n}.xml': statute(f'A-{n}', [section(1, f'Act number {n}.'), section(2, 'More.')])
+        for n in range(1, 5)}
+
+@pytest.fixture
+def sync(laws_server, tmp_path):
+    laws_server.documents.update(ACTS)
+    csv_file = tmp_path / 'acts.csv'
+    csv_file.write_text('xml_link\n' + ''.join(laws_server.url(path) + '\n' for path in sorted(ACTS)))
+    output_dir = str(tmp_path / 'md')
+
+    def run(**options):
+        xml_to_md.main(str(csv_file), output_dir, concurrency=2, processes=1, mirror_dir=str(tmp_path / 'xml'),
+                       retries=0, **options)
+        return output_dir
+    return run
+
+def journal_records(output_dir):
+    with open(os.path.join(output_dir, '.sync-journal.jsonl'), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_resume_skips_settled_acts(sync, laws_server):
+    output_dir = sync()
+    records = journal_records(output_dir)
+    assert records[-1]['event'] == 'end' and records[-1]['failures'] == 0
+    expected = {name: open(os.path.join(output_dir, name), encoding='utf-8').read()
+                for name in os.listdir(output_dir) if name.endswith('.md')}
+    assert sorted(expected) == ['A-1.md', 'A-2.md', 'A-3.md', 'A-4.md']
+
+    # Kill the sync after it settled A-1 and A-3, before the manifest was
+    # saved: the journal is all that is left
+    kept = [records[0]] + [r for r in records if r.get('act') in ('A-1.md', 'A-3.md')]
+    with open(os.path.join(output_dir, '.sync-journal.jsonl'), 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(r) + '\n' for r in kept)
+    os.remove(os.path.join(output_dir, '.build-manifest.json'))
+    os.remove(os.path.join(output_dir, 'A-2.md'))
+    laws_server.requests.clear()
+
+    sync()
+    assert sorted(laws_server.gets()) == ['/eng/XML/A-2.xml', '/eng/XML/A-4.xml']
+    for name, md in expected.items():
+        assert open(os.path.join(output_dir, name), encoding='utf-8').read() == md
+    records = journal_records(output_dir)
+    assert records[len(kept)]['event'] == 'resume'
+    assert records[-1]['event'] == 'end'
+
+    # The manifest was rebuilt from both runs, so nothing is redone next time
+    laws_server.requests.clear()
+    sync()
+    assert laws_server.gets(200) == []
+    assert journal_records(output_dir)[0]['event'] == 'start'
+    assert [r['status'] for r in journal_records(output_dir) if 'status' in r] == ['unchanged'] * 4
+
+def test_failed_act_is_retried_next_run(sync, laws_server):
+    del laws_server.documents['/eng/XML/A-3.xml']
+    output_dir = sync()
+    failed = [r for r in journal_records(output_dir) if r.get('status') == 'failed']
+    assert [(r['act'], r['stage']) for r in failed] == [('A-3.md', 'download')]
+    assert not os.path.exists(os.path.join(output_dir, 'A-3.md'))
+
+    laws_server.documents['/eng/XML/A-3.xml'] = ACTS['/eng/XML/A-3.xml']
+    laws_server.requests.clear()
+    sync()
+    assert laws_server.gets(200) == ['/eng/XML/A-3.xml']
+    assert os.path.exists(os.path.join(output_dir, 'A-3.md'))
+
+def test_restart_ignores_the_journal(sync, laws_server):
+    output_dir = sync()
+    records = journal_records(output_dir)
+    with open(os.path.join(output_dir, '.sync-journal.jsonl'), 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(r) + '\n' for r in records[:-1])
+    os.remove(os.path.join(output_dir, '.build-manifest.json'))
+    laws_server.requests.clear()
+
+    sync(restart=True)
+    assert sorted(laws_server.gets()) == sorted(ACTS)
+    assert journal_records(output_dir)[0]['event'] == 'start'
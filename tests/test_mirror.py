@@ -0,0 +1,91 @@
+import os
+import hashlib
+
+import pytest
+
+import xml_to_md
+from conftest import statute, section
+
+ACTS = {f'/eng/XML/A-{n}.xml': statute(f'A-{n}', [section(1, f'Act number {n}.')]) for n in range(1, 6)}
+
+def read(xml):
+    with xml_to_md.xml_stream(xml) as f:
+        return f.read()
+
+@pytest.fixture
+def server(laws_server):
+    laws_server.documents.update(ACTS)
+    return laws_server
+
+def mirrored_fetcher(mirror_dir, compression='gzip', offline=False):
+    return xml_to_md.MirroredFetcher(xml_to_md.KeepAliveFetcher(timeout=10),
+                                     xml_to_md.XMLMirror(str(mirror_dir), compression), offline)
+
+def test_connection_is_reused(server):
+    fetcher = xml_to_md.KeepAliveFetcher(timeout=10)
+    for path, data in ACTS.items():
+        assert fetcher.fetch(server.url(path)) == data
+    fetcher.close()
+    assert server.connections == 1
+
+def test_missing_act_raises_status_error(server):
+    fetcher = xml_to_md.KeepAliveFetcher(timeout=10)
+    with pytest.raises(xml_to_md.HTTPStatusError) as error:
+        fetcher.fetch(server.url('/eng/XML/missing.xml'))
+    assert error.value.status == 404
+    assert not xml_to_md.transient_error(error.value)
+
+@pytest.mark.parametrize('compression', ['none', 'gzip'])
+def test_download_is_mirrored_then_revalidated(server, tmp_path, compression):
+    url = server.url('/eng/XML/A-1.xml')
+    fetcher = mirrored_fetcher(tmp_path, compression)
+
+    first = fetcher.fetch(url)
+    assert isinstance(first, xml_to_md.MirroredXML)
+    assert read(first) == ACTS['/eng/XML/A-1.xml']
+    assert first.size == len(ACTS['/eng/XML/A-1.xml'])
+    assert first.sha256 == hashlib.sha256(ACTS['/eng/XML/A-1.xml']).hexdigest()
+
+    # Unchanged: a conditional GET, answered with 304 and served from disk
+    second = fetcher.fetch(url)
+    assert server.gets() == ['/eng/XML/A-1.xml'] * 2
+    assert [code for _, _, code in server.requests] == [200, 304]
+    assert (second.path, second.sha256) == (first.path, first.sha256)
+    assert fetcher.counts == {'downloaded': 1, 'not_modified': 1, 'offline': 0}
+
+    # Amended upstream: downloaded and mirrored again
+    amended = statute('A-1', [section(1, 'Amended.')])
+    server.documents['/eng/XML/A-1.xml'] = amended
+    assert read(fetcher.fetch(url)) == amended
+    assert fetcher.counts['downloaded'] == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_offline_reads_only_the_mirror(server, tmp_path):
+    online = mirrored_fetcher(tmp_path)
+    for path in ACTS:
+        online.fetch(server.url(path))
+    requests = len(server.requests)
+
+    offline = mirrored_fetcher(tmp_path, offline=True)
+    for path, data in ACTS.items():
+        assert read(offline.fetch(server.url(path))) == data
+    with pytest.raises(FileNotFoundError):
+        offline.fetch(server.url('/eng/XML/A-99.xml'))
+    assert len(server.requests) == requests
+    assert offline.counts['offline'] == len(ACTS)
+
+def test_failed_download_leaves_no_mirror_entry(server, tmp_path):
+    fetcher = mirrored_fetcher(tmp_path)
+    with pytest.raises(xml_to_md.HTTPStatusError):
+        fetcher.fetch(server.url('/eng/XML/missing.xml'))
+    assert os.listdir(tmp_path) == []
+
+def test_mirror_is_recompressed_on_first_use(server, tmp_path):
+    # A copy stored uncompressed is rewritten, not downloaded again, when
+    # the mirror switches to gzip
+    url = server.url('/eng/XML/A-2.xml')
+    mirrored_fetcher(tmp_path, 'none').fetch(url)
+    xml = mirrored_fetcher(tmp_path, 'gzip').fetch(url)
+    assert xml.compression == 'gzip' and xml.path.endswith('.xml.gz')
+    assert read(xml) == ACTS['/eng/XML/A-2.xml']
+    assert [code for _, _, code in server.requests] == [200, 304]
@@ -0,0 +1,73 @@
+import pytest
+
+import benchmark
+import xml_to_md
+from conftest import statute
+
+pytest.importorskip('lxml')
+
+# xml.etree drops comments and processing instructions while lxml keeps
+# them as children unless told not to, so both are scattered through the
+# places the handlers read text from: labels, marginal notes, Text with
+# inline markup, definitions and the tails around them.
+ANNOTATED = statute('T-1', [
+    '<!-- consolidated 2024-01-01 --><?lims-page 1?>',
+    '<Heading level="2"><Label>PART <!-- roman -->1</Label><TitleText>General<?br?></TitleText></Heading>',
+    '<Section><Label>1<!-- x --></Label><MarginalNote>Short <?pi?>title</MarginalNote>'
+    '<Text>This Act may be cited as the <!-- c --><XRefExternal link="T-1">Testing Act</XRefExternal>.</Text>'
+    '</Section>',
+    '<Section><Label>2</Label><MarginalNote>Definitions</MarginalNote>'
+    '<Text>The following definitions apply in this Act.</Text>'
+    '<Definition><Text><DefinedTermEn>court</DefinedTermEn><!-- n --> means a court; '
+    '(<DefinedTermFr>tribunal</DefinedTermFr>)</Text></Definition>'
+    '<Definition><Text><DefinedTermEn>day</DefinedTermEn> means<?pi?> a day; (<DefinedTermFr>jour</DefinedTermFr>)'
+    '</Text><Paragraph><Label>(a)</Label><Text>a clear day; <!-- f -->(<DefinedTermFr>x</DefinedTermFr>)</Text>'
+    '</Paragraph></Definition></Section>',
+    '<Section><Label>3</Label><Subsection><Label>(1)</Label><MarginalNote>Rule</MarginalNote>'
+    '<Text>A person <?pi?>shall<!-- c --> comply.</Text>'
+    '<Paragraph><Label>(a)</Label><Text>in <Emphasis>every</Emphasis><!-- c --> case;</Text>'
+    '<Subparagraph><Label>(i)</Label><Text>first<?pi?>,</Text>'
+    '<Clause><Label>(A)</Label><Text>one<!-- c --></Text></Clause>'
+    '<ContinuedSubparagraph><Text>and then<!-- c --></Text></ContinuedSubparagraph></Subparagraph>'
+    '<ContinuedParagraph><Text>after all<?pi?>.</Text></ContinuedParagraph></Paragraph>'
+    '</Subsection><Subsection><Label>(2)</Label>'
+    '<ContinuedSectionSubsection><Text>Continued <!-- c -->text.</Text></ContinuedSectionSubsection>'
+    '</Subsection></Section>',
+])
+
+DOCUMENTS = {
+    'annotated': ANNOTATED,
+    'synthetic': benchmark.generate_statute(60, seed=3),
+}
+
+@pytest.mark.parametrize('document', sorted(DOCUMENTS))
+@pytest.mark.parametrize('streaming', [False, True], ids=['tree', 'streaming'])
+@pytest.mark.parametrize('language', ['eng', 'fra'])
+def test_lxml_renders_like_stdlib(document, streaming, language):
+    xml = DOCUMENTS[document]
+    stdlib = xml_to_md.get_parser('stdlib', language)
+    lxml = xml_to_md.get_parser('lxml', language)
+    assert lxml.name == 'lxml'
+    expected = xml_to_md.xml_bytes_to_md(xml, streaming=False, parser=stdlib)
+    assert xml_to_md.xml_bytes_to_md(xml, streaming=streaming, parser=stdlib) == expected
+    assert xml_to_md.xml_bytes_to_md(xml, streaming=streaming, parser=lxml) == expected
+
+def test_comments_and_processing_instructions_are_dropped():
+    md = xml_to_md.xml_bytes_to_md(ANNOTATED, parser='lxml')
+    assert '#### 1. Short title\n' in md
+    assert 'This Act may be cited as the Testing Act.\n' in md
+    assert '- **court**means a court;\n' in md
+    assert '\t\t\t- (A) one\n' in md
+    assert 'consolidated' not in md and 'lims-page' not in md
+
+@pytest.mark.parametrize('streaming', [False, True], ids=['tree', 'streaming'])
+def test_lxml_outputs_match_stdlib(streaming):
+    # Every format, the chunks and the section records from one walk
+    options = {'streaming': streaming, 'chunk_tokens': 64, 'sections': True, 'deltas': True,
+               'formats': ['text', 'jsonl']}
+    xml = DOCUMENTS['synthetic']
+    stdlib = xml_to_md.convert_act(xml, 'B-0.1', dict(options, parser='stdlib'))
+    lxml = xml_to_md.convert_act(xml, 'B-0.1', dict(options, parser='lxml'))
+    for result in (stdlib, lxml):
+        del result['convert_s']
+    assert lxml == stdlib
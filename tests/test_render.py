@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import benchmark
+import xml_to_md
+from conftest import statute, section
+
+# Every line kind, including a Clause with more than its Label and Text
+# and definitions in a Subsection
+LINES = statute('R-1', [
+    '<Heading level="2"><Label>PART 1</Label><TitleText>General</TitleText></Heading>',
+    '<Heading level="3"><TitleText>Unlabelled</TitleText></Heading>',
+    section('1', 'A person shall comply.'),
+    '<Section><Label>2</Label><Subsection><Label>(1)</Label><MarginalNote>Definitions</MarginalNote>'
+    '<Text>The following definitions apply in this section.</Text>'
+    '<Definition><Text><DefinedTermEn>day</DefinedTermEn> means a day; (<DefinedTermFr>jour</DefinedTermFr>)</Text>'
+    '<Paragraph><Label>(a)</Label><Text>a clear day; (<DefinedTermFr>x</DefinedTermFr>)</Text></Paragraph>'
+    '</Definition></Subsection>'
+    '<Subsection><Label>(2)</Label><ContinuedSectionSubsection><Text>Continued.</Text></ContinuedSectionSubsection>'
+    '</Subsection></Section>',
+    '<Section><Label>3</Label><MarginalNote>Rule</MarginalNote><Text>Lead-in.</Text>'
+    '<Paragraph><Label>(a)</Label><Text>in every case,</Text>'
+    '<Subparagraph><Label>(i)</Label><Text>first,</Text>'
+    '<Clause><Label>(A)</Label><Text>one</Text><Subclause><Label>(I)</Label><Text>x</Text></Subclause></Clause>'
+    '<Clause><Text>unlabelled</Text></Clause>'
+    '<ContinuedSubparagraph><Text>and then</Text></ContinuedSubparagraph></Subparagraph>'
+    '<ContinuedParagraph><Text>after all.</Text></ContinuedParagraph></Paragraph></Section>',
+])
+
+DOCUMENTS = {
+    'lines': LINES,
+    'synthetic': benchmark.generate_statute(60, seed=3),
+}
+
+@pytest.mark.parametrize('document', sorted(DOCUMENTS))
+@pytest.mark.parametrize('streaming', [False, True], ids=['tree', 'streaming'])
+def test_render_paths_agree(document, streaming):
+    # dispatch(), the targets of the multi-format render and the IR all
+    # produce the same Markdown
+    xml = DOCUMENTS[document]
+    direct = xml_to_md.xml_bytes_to_md(xml, streaming=streaming)
+    assert direct == xml_to_md.xml_bytes_to_md(xml)
+    assert xml_to_md.xml_bytes_to_outputs(xml, streaming=streaming)['md'] == direct
+    assert xml_to_md.render_ir_md(xml_to_md.build_ir(xml, streaming)) == direct
+
+@pytest.mark.parametrize('document', sorted(DOCUMENTS))
+@pytest.mark.parametrize('streaming', [False, True], ids=['tree', 'streaming'])
+def test_one_pass_matches_separate_renders(document, streaming):
+    xml = DOCUMENTS[document]
+    together = xml_to_md.xml_bytes_to_outputs(xml, ('md', 'text', 'jsonl'), streaming=streaming)
+    for name in ('md', 'text', 'jsonl'):
+        assert together[name] == xml_to_md.xml_bytes_to_outputs(xml, (name,), streaming=streaming)[name]
+    assert together['md'] == xml_to_md.xml_bytes_to_md(xml, streaming=streaming)
+
+    # A JSONL record per rendered line, pointing at its parent's line, and
+    # text without the Markdown
+    records = [json.loads(line) for line in together['jsonl'].splitlines()]
+    assert all(-1 <= record['parent'] < row for row, record in enumerate(records))
+    assert len(records) == len(xml_to_md.build_ir(xml))
+    assert '**' not in together['text'] and '\n#' not in together['text']
+
+@pytest.mark.parametrize('streaming', [False, True], ids=['tree', 'streaming'])
+def test_xml_to_md_writes_every_format(tmp_path, streaming):
+    source = tmp_path / 'R-1.xml'
+    source.write_bytes(LINES)
+    outputs = {name: str(tmp_path / f'together{xml_to_md.OUTPUT_EXTENSIONS[name]}') for name in ('text', 'jsonl')}
+    assert xml_to_md.xml_to_md(str(source), str(tmp_path / 'together.md'), streaming=streaming, outputs=outputs)
+    separate = xml_to_md.xml_bytes_to_outputs(LINES, ('md', 'text', 'jsonl'))
+    for name, extension in xml_to_md.OUTPUT_EXTENSIONS.items():
+        assert (tmp_path / f'together{extension}').read_text(encoding='utf-8') == separate[name]
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import embeddings
+import vector_index
+
+def write_chunks(path, act, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'id': f'{act}:{i}', 'act': act, 'section': str(i + 1), 'labels': [str(i + 1)],
+                                'text': f'{act} section {i + 1} about topic {i % 7} and matter {i % 5}'}) + '\n')
+
+@pytest.fixture
+def chunk_files(tmp_path):
+    files = [str(tmp_path / 'A-1.chunks.jsonl'), str(tmp_path / 'B-1.chunks.jsonl')]
+    write_chunks(files[0], 'A-1', 40)
+    write_chunks(files[1], 'B-1', 60)
+    return files
+
+@pytest.mark.parametrize('int8', [False, True], ids=['float', 'int8'])
+def test_index_cites_the_store_it_was_built_from(tmp_path, chunk_files, int8):
+    store = str(tmp_path / 'store')
+    encoder = embeddings.HashingEncoder(64)
+    embeddings.build_store(chunk_files, store, encoder)
+    vector_index.build_index(store, nlist=4, int8=int8)
+    query = encoder.encode(['B-1 section 12 about topic 4 and matter 1'])[0]
+    index = vector_index.IVFIndex(store)
+    assert index.citation(index.search(query, k=1, nprobe=4)[0][1])['id'] == 'B-1:11'
+
+    # Rebuilt from the same chunks it still matches
+    embeddings.build_store(chunk_files, store, encoder)
+    vector_index.IVFIndex(store)
+
+    # The same chunks in another order, or fewer of them: the rows no
+    # longer line up with the index
+    embeddings.build_store(chunk_files[::-1], store, encoder)
+    with pytest.raises(ValueError, match='rebuild it'):
+        vector_index.IVFIndex(store)
+    embeddings.build_store(chunk_files[:1], store, encoder)
+    with pytest.raises(ValueError, match='rebuild it'):
+        vector_index.IVFIndex(store)
+
+    vector_index.build_index(store, nlist=4, int8=int8)
+    index = vector_index.IVFIndex(store)
+    assert index.citation(index.search(encoder.encode(['A-1 section 3 about topic 2 and matter 2'])[0],
+                                       k=1, nprobe=4)[0][1])['id'] == 'A-1:2'
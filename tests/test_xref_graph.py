@@ -0,0 +1,62 @@
+import json
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import xml_to_md
+import xref_graph
+from conftest import statute, section
+
+def write_sections(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+def test_queries_match_the_edge_list(tmp_path):
+    rng = random.Random(7)
+    acts = [f'A-{n}' for n in range(6)]
+    records, edges = [], set()
+    for act in acts:
+        for label in map(str, range(1, 30)):
+            xrefs = []
+            for _ in range(rng.randint(0, 5)):
+                target = [rng.choice(acts), str(rng.randint(1, 40)) if rng.random() < 0.8 else None]
+                xrefs.append(target)
+                if tuple(target) != (act, label):
+                    edges.add(((act, label), tuple(target)))
+            records.append({'act': act, 'section': label, 'xrefs': xrefs})
+    # A section citing itself, and the same reference twice
+    records.append({'act': 'B-1', 'section': '1', 'xrefs': [['B-1', '1'], ['A-1', '2'], ['A-1', '2']]})
+    edges.add((('B-1', '1'), ('A-1', '2')))
+    write_sections(tmp_path / 'all.sections.jsonl', records)
+
+    stats = xref_graph.build_graph([str(tmp_path / 'all.sections.jsonl')], str(tmp_path / 'graph'))
+    assert stats['edges'] == len(edges)
+    graph = xref_graph.XrefGraph(str(tmp_path / 'graph'))
+    assert stats['nodes'] == len(graph.nodes)
+    for node in graph.nodes:
+        assert sorted(graph.cites(*node), key=str) == sorted((t for s, t in edges if s == node), key=str)
+        assert sorted(graph.cited_by(*node), key=str) == sorted((s for s, t in edges if t == node), key=str)
+    assert graph.cites('B-1', '1') == [('A-1', '2')]
+    assert graph.cites('Z-9', '1') == []
+
+def test_references_from_converted_sections(tmp_path):
+    xml = statute('A-1', [
+        section(1, 'Short title.'),
+        section(2, 'Subject to section <XRefInternal>1</XRefInternal> and paragraph '
+                   '<XRefInternal>3(1)(a)</XRefInternal> of this Act and the '
+                   '<XRefExternal reference-type="act" link="C-46">Criminal Code</XRefExternal>.'),
+        section(3, 'As in <XRefInternal>2</XRefInternal>, <XRefInternal>2</XRefInternal> again.'),
+    ])
+    result = xml_to_md.convert_act(xml, 'A-1', {'streaming': True, 'parser': 'stdlib', 'sections': True})
+    write_sections(tmp_path / 'A-1.sections.jsonl', result['sections'])
+
+    xref_graph.build_graph([str(tmp_path / 'A-1.sections.jsonl')], str(tmp_path / 'graph'))
+    graph = xref_graph.XrefGraph(str(tmp_path / 'graph'))
+    assert graph.cites('A-1', '2') == [('A-1', '1'), ('A-1', '3'), ('C-46', None)]
+    assert graph.cites('A-1', '3') == [('A-1', '2')]
+    assert graph.cited_by('A-1', '2') == [('A-1', '3')]
+    assert graph.cited_by('C-46') == [('A-1', '2')]
+    assert graph.cites('A-1', '1') == []
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import hashlib
+import shutil
+import tempfile
+import argparse
+import numpy as np
+
+import embeddings
+
+# Partitioned (IVF) approximate nearest-neighbour index over an embedding
+# store built by embeddings.py. Vectors are clustered with spherical
+# k-means; a query is compared against the centroids first and then only
+# against the vectors of the `nprobe` closest partitions. The index lives
+# in <store>/ivf/ and is memory-mapped at query time:
+#
+#   centroids.npy  (nlist, dim) float32
+#   offsets.npy    (nlist + 1,) partition p is rows offsets[p]:offsets[p+1]
+#   ids.npy        (rows,) store row of each index row
+#   vectors.npy    (rows, dim) the vectors in partition order, or with
+#   codes.npy      --int8: (rows, dim) int8 codes and
+#   scales.npy     (rows,) float32 per-vector scale
+#   index.json     parameters, and the identity of the store it indexes
+#
+# With int8 codes the partitions are scanned approximately and the best
+# candidates are re-ranked exactly against the store's own vectors.
+#
+#   python vector_index.py build store --int8
+#   python vector_index.py search store "designated person" -k 5
+#   python vector_index.py bench store --queries 200 --nprobe 1,4,16
+
+BLOCK = 65536
+
+def normalize(x):
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+def nearest_centroids(vectors, centroids):
+    # Assign every vector to its most similar centroid, BLOCK rows at a time
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), BLOCK):
+        block = np.asarray(vectors[start:start + BLOCK], dtype=np.float32)
+        assign[start:start + BLOCK] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+def kmeans(sample, nlist, iterations=20, seed=0):
+    # Spherical k-means (Lloyd's iterations on unit vectors, cosine
+    # similarity). Empty clusters are re-seeded from random sample points.
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroids(sample, centroids)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = np.flatnonzero(counts)
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty])
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = sample[rng.choice(len(sample), len(empty))]
+        centroids = normalize(sums)
+    return centroids
+
+def quantize(vectors):
+    # Symmetric per-vector int8: x ~= codes * scale
+    scales = np.max(np.abs(vectors), axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+def store_identity(meta, info):
+    # What an index is only valid for: the store's encoder and the text
+    # behind each row, in row order. A store rebuilt from the same chunks
+    # in another order, or with chunks added or removed, is a different
+    # store even when its row count is the same.
+    h = hashlib.sha256()
+    for row in meta:
+        h.update(row['sha256'].encode('ascii'))
+    return {'rows': len(meta), 'encoder': info['encoder'], 'meta_sha256': h.hexdigest()}
+
+def build_index(store_dir, nlist=None, int8=False, sample_size=100000, iterations=20, seed=0, index_dir=None):
+    # Into <store>/ivf/ unless `index_dir` is given. The index is built in
+    # a sibling directory and swapped in only once it is complete, so a
+    # failed build leaves the previous index as it was.
+    vectors, meta, info = embeddings.load_store(store_dir)
+    rows, dim = vectors.shape
+    if nlist is None:
+        nlist = max(1, int(4 * np.sqrt(rows)))
+    nlist = min(nlist, rows)
+    final_dir = index_dir or os.path.join(store_dir, 'ivf')
+    index_dir = final_dir + '.tmp'
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.makedirs(index_dir)
+
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(rows, min(rows, max(sample_size, nlist)), replace=False))
+    sample = normalize(np.asarray(vectors[sample_rows], dtype=np.float32))
+    centroids = kmeans(sample, nlist, iterations, seed).astype(np.float32)
+
+    assign = nearest_centroids(vectors, centroids)
+    ids = np.argsort(assign, kind='stable').astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist)))).astype(np.int64)
+
+    np.save(os.path.join(index_dir, 'centroids.npy'), centroids)
+    np.save(os.path.join(index_dir, 'offsets.npy'), offsets)
+    np.save(os.path.join(index_dir, 'ids.npy'), ids)
+    if int8:
+        codes = np.lib.format.open_memmap(os.path.join(index_dir, 'codes.npy'), mode='w+', dtype=np.int8,
+                                          shape=(rows, dim))
+        scales = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, BLOCK):
+            block = np.asarray(vectors[ids[start:start + BLOCK]], dtype=np.float32)
+            codes[start:start + BLOCK], scales[start:start + BLOCK] = quantize(block)
+        codes.flush()
+        np.save(os.path.join(index_dir, 'scales.npy'), scales)
+    else:
+        ordered = np.lib.format.open_memmap(os.path.join(index_dir, 'vectors.npy'), mode='w+',
+                                            dtype=vectors.dtype, shape=(rows, dim))
+        for start in range(0, rows, BLOCK):
+            ordered[start:start + BLOCK] = vectors[ids[start:start + BLOCK]]
+        ordered.flush()
+    with open(os.path.join(index_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'nlist': nlist, 'rows': rows, 'dim': dim, 'int8': int8, 'encoder': info['encoder'],
+                   'store': store_identity(meta, info)}, f, indent=1)
+
+    # A directory can't replace a non-empty one, so the old index is moved
+    # aside first and removed once the new one is in place
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir + '.old', ignore_errors=True)
+        os.replace(final_dir, final_dir + '.old')
+    os.replace(index_dir, final_dir)
+    shutil.rmtree(final_dir + '.old', ignore_errors=True)
+
+class IVFIndex:
+    # ValueError if the index was not built from the store as it is now:
+    # its rows would point at the wrong chunks, or past the end
+    def __init__(self, store_dir, index_dir=None):
+        self.store_vectors, self.meta, self.store_info = embeddings.load_store(store_dir)
+        index_dir = index_dir or os.path.join(store_dir, 'ivf')
+        with open(os.path.join(index_dir, 'index.json'), encoding='utf-8') as f:
+            self.info = json.load(f)
+        if self.info.get('store') != store_identity(self.meta, self.store_info):
+            raise ValueError(f"The index in '{index_dir}' was built from a different version of the store "
+                             f"in '{store_dir}'; rebuild it with: python vector_index.py build {store_dir}")
+        self.centroids = np.load(os.path.join(index_dir, 'centroids.npy'))
+        self.offsets = np.load(os.path.join(index_dir, 'offsets.npy'))
+        self.ids = np.load(os.path.join(index_dir, 'ids.npy'), mmap_mode='r')
+        self.int8 = self.info['int8']
+        if self.int8:
+            self.codes = np.load(os.path.join(index_dir, 'codes.npy'), mmap_mode='r')
+            self.scales = np.load(os.path.join(index_dir, 'scales.npy'), mmap_mode='r')
+        else:
+            self.vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+
+    def search(self, query, k=10, nprobe=8, rerank=4):
+        # -> [(score, store row)], best first
+        query = normalize(np.asarray(query, dtype=np.float32))
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        rows, scores = [], []
+        for p in probes:
+            start, end = self.offsets[p], self.offsets[p + 1]
+            if start == end:
+                continue
+            if self.int8:
+                part = (self.codes[start:end].astype(np.float32) @ query) * self.scales[start:end]
+            else:
+                part = np.asarray(self.vectors[start:end], dtype=np.float32) @ query
+            rows.append(np.arange(start, end))
+            scores.append(part)
+        if not rows:
+            return []
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+
+        keep = min(len(scores), k * rerank if self.int8 else k)
+        top = np.argpartition(-scores, keep - 1)[:keep]
+        candidates = np.asarray(self.ids[rows[top]])
+        if self.int8:
+            # Exact scores for the shortlist from the full-precision store
+            order = np.argsort(candidates)
+            exact = np.asarray(self.store_vectors[candidates[order]], dtype=np.float32) @ query
+            candidates, scores = candidates[order], exact
+        else:
+            scores = scores[top]
+        best = np.argsort(-scores)[:k]
+        return [(float(scores[i]), int(candidates[i])) for i in best]
+
+    def citation(self, row):
+        meta = self.meta[row]
+        return {'id': meta['id'], 'act': meta['act'], 'section': meta['section'], 'labels': meta['labels']}
+
+def brute_force(vectors, query, k):
+    scores = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), BLOCK):
+        scores[start:start + BLOCK] = np.asarray(vectors[start:start + BLOCK], dtype=np.float32) @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+def encoder_for(info):
+    # The query has to be embedded the way the store was
+    if info['encoder'].startswith('hashing-'):
+        return embeddings.HashingEncoder(info['dim'])
+    raise ValueError(f"Pass --encoder to embed queries for a store built with {info['encoder']}")
+
+def benchmark(store_dir, queries=200, k=10, nprobes=(1, 4, 16), nlist=None, seed=0):
+    # Build float and int8 indexes (in a scratch directory, leaving the
+    # store's own index alone), then time queries and measure recall@k
+    # against exact brute-force search. Queries are stored vectors with
+    # noise (about a fifth of their length) added, so each has a meaningful neighbourhood in the corpus.
+    vectors, _, _ = embeddings.load_store(store_dir)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), queries, replace=False)
+    noise = rng.normal(0, 0.2 / np.sqrt(vectors.shape[1]), (queries, vectors.shape[1]))
+    query_vectors = normalize(np.asarray(vectors[np.sort(picks)], dtype=np.float32) + noise.astype(np.float32))
+
+    start = time.perf_counter()
+    truth = [set(brute_force(vectors, q, k).tolist()) for q in query_vectors]
+    brute_ms = (time.perf_counter() - start) * 1000 / queries
+
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}; brute force {brute_ms:.2f} ms/query")
+    print(f"{'index':<8}{'build s':>9}{'nprobe':>8}{'ms/query':>10}{f'recall@{k}':>11}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix='ivf-bench-') as scratch:
+        for int8 in (False, True):
+            index_dir = os.path.join(scratch, 'int8' if int8 else 'float')
+            start = time.perf_counter()
+            build_index(store_dir, nlist, int8, seed=seed, index_dir=index_dir)
+            build_s = time.perf_counter() - start
+            index = IVFIndex(store_dir, index_dir)
+            for nprobe in nprobes:
+                start = time.perf_counter()
+                found = [index.search(q, k, nprobe) for q in query_vectors]
+                query_ms = (time.perf_counter() - start) * 1000 / queries
+                recall = np.mean([len(truth[i] & {row for _, row in hits}) / k for i, hits in enumerate(found)])
+                name = 'int8' if int8 else 'float'
+                print(f"{name:<8}{build_s:>9.2f}{nprobe:>8}{query_ms:>10.2f}{recall:>11.3f}")
+                results.append({'index': name, 'build_s': build_s, 'nprobe': nprobe, 'query_ms': query_ms,
+                                'recall': float(recall), 'brute_force_ms': brute_ms})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF vector index over an embedding store.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="cluster the store's vectors into an index")
+    build.add_argument('store_dir')
+    build.add_argument('--nlist', type=int, default=None, help="number of partitions (default 4*sqrt(rows))")
+    build.add_argument('--int8', action='store_true', help="store int8 codes and re-rank exactly")
+
+    search = sub.add_parser('search', help="find the chunks closest to a query")
+    search.add_argument('store_dir')
+    search.add_argument('query')
+    search.add_argument('-k', type=int, default=10)
+    search.add_argument('--nprobe', type=int, default=8)
+    search.add_argument('--encoder', default=None, help="'package.module:factory' if not the hashing encoder")
+
+    bench = sub.add_parser('bench', help="build times, query latency and recall against brute force")
+    bench.add_argument('store_dir')
+    bench.add_argument('--queries', type=int, default=200)
+    bench.add_argument('-k', type=int, default=10)
+    bench.add_argument('--nprobe', default='1,4,16')
+    bench.add_argument('--nlist', type=int, default=None)
+    bench.add_argument('--output', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        build_index(args.store_dir, args.nlist, args.int8)
+        print(f"Built index in {time.perf_counter() - start:.2f}s")
+    elif args.command == 'search':
+        try:
+            index = IVFIndex(args.store_dir)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        encoder = embeddings.load_encoder(args.encoder) if args.encoder else encoder_for(index.store_info)
+        for score, row in index.search(encoder.encode([args.query])[0], args.k, args.nprobe):
+            cite = index.citation(row)
+            print(f"{score:.3f}  {cite['act']} s. {cite['section']}  {', '.join(cite['labels'][:3])}")
+    else:
+        results = benchmark(args.store_dir, args.queries, args.k, [int(n) for n in args.nprobe.split(',')],
+                            args.nlist)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2658 @@
+import xml.etree.ElementTree as ET
+import os
+import io
+import csv
+import argparse
+import hashlib
+import copy
+import json
+import re
+import time
+import heapq
+import contextlib
+import marshal
+import types
+from array import array
+import queue
+import threading
+import signal
+import _thread
+import urllib.parse
+import shutil
+
+# http.client, urllib.request, multiprocessing, concurrent.futures and lxml
+# are imported where they are used, so that converting or chunking a single
+# act doesn't pay for the machinery of a full sync.
+
+# Parser backends. Both build trees the handlers can walk with the same
+# ElementTree API. lxml parses the large statutes several times faster, but
+# every element the handlers touch becomes a Python proxy object and its
+# find() is slower, so on the full parse + render the stdlib tree still
+# comes out ahead. lxml is there for when parsing is the cost that matters
+# (or for its huge_tree limits); it falls back to xml.etree if missing.
+
+class StdlibParser:
+    name = 'stdlib'
+
+    def parse(self, source):
+        return ET.parse(source).getroot()
+
+    def fromstring(self, xml_bytes):
+        return ET.fromstring(xml_bytes)
+
+    def iterparse(self, source, events):
+        return ET.iterparse(source, events=events)
+
+class LxmlParser:
+    # xml.etree silently drops comments and processing instructions; lxml
+    # keeps them as children unless told not to, which would change what
+    # .text and itertext() return. huge_tree lifts libxml2's limits on text
+    # node size and depth, which the biggest schedules can exceed.
+    name = 'lxml'
+    options = {'huge_tree': True, 'remove_comments': True, 'remove_pis': True}
+
+    def __init__(self):
+        # ImportError if lxml is not installed
+        from lxml import etree
+        self.etree = etree
+
+    def parse(self, source):
+        return self.etree.parse(source, self.etree.XMLParser(**self.options)).getroot()
+
+    def fromstring(self, xml_bytes):
+        return self.etree.fromstring(xml_bytes, self.etree.XMLParser(**self.options))
+
+    def iterparse(self, source, events):
+        return self.etree.iterparse(source, events=events, **self.options)
+
+class FrenchParser:
+    # The French consolidations (/fra/XML/) mirror the English ones except
+    # that the term being defined or used is a DefinedTermFr and the other
+    # language's equivalent, in parentheses, is a DefinedTermEn. Swapping the
+    # two tags as the tree is built lets every handler read DefinedTermEn as
+    # "the term in this language" and drop DefinedTermFr as "the equivalent"
+    # whichever language it is converting.
+    swap = {'DefinedTermEn': 'DefinedTermFr', 'DefinedTermFr': 'DefinedTermEn'}
+
+    def __init__(self, base):
+        self.base = base
+        self.name = base.name
+
+    def _swap(self, elem):
+        tag = self.swap.get(elem.tag)
+        if tag is not None:
+            elem.tag = tag
+
+    def parse(self, source):
+        root = self.base.parse(source)
+        for elem in root.iter():
+            self._swap(elem)
+        return root
+
+    def fromstring(self, xml_bytes):
+        root = self.base.fromstring(xml_bytes)
+        for elem in root.iter():
+            self._swap(elem)
+        return root
+
+    def iterparse(self, source, events):
+        for event, elem in self.base.iterparse(source, events):
+            if event == 'end':
+                self._swap(elem)
+            yield event, elem
+
+def get_parser(name='stdlib', language='eng'):
+    # `name` may also be a parser that was already set up, which is passed
+    # through, so callers can hand a FrenchParser down to the converters.
+    if not isinstance(name, (str, type(None))):
+        return name
+    if name in (None, 'stdlib'):
+        parser = StdlibParser()
+    elif name == 'lxml':
+        try:
+            parser = LxmlParser()
+        except ImportError:
+            print("lxml is not installed; falling back to xml.etree")
+            parser = StdlibParser()
+    else:
+        raise ValueError(f"Unknown parser backend: {name}")
+    return FrenchParser(parser) if language == 'fra' else parser
+
+class HTTPStatusError(OSError):
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status} fetching {url}")
+        self.status = status
+
+def transient_error(error):
+    # Worth retrying: a dropped or timed-out connection, or the server
+    # asking us to come back later. A 404 or a malformed act is not.
+    if isinstance(error, HTTPStatusError):
+        return error.status == 429 or error.status >= 500
+    import http.client
+    import socket
+    return isinstance(error, (ConnectionError, TimeoutError, socket.timeout, http.client.HTTPException))
+
+def read_body(response, body_sink=None, chunk_size=1 << 16):
+    # The whole body; or, if body_sink is given, None once every chunk has
+    # been written to body_sink() (so a large act is never held in memory)
+    if body_sink is None:
+        return response.read()
+    sink = body_sink()
+    try:
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            sink.write(chunk)
+    except BaseException:
+        sink.discard()
+        raise
+    return None
+
+class KeepAliveFetcher:
+    # Reuses one persistent HTTP(S) connection per host per thread, so a
+    # worker downloading many acts from laws-lois.justice.gc.ca pays the
+    # TCP/TLS handshake once instead of once per act.
+    def __init__(self, timeout=60, max_redirects=5):
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._local = threading.local()
+
+    def _connection(self, scheme, netloc):
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            import http.client
+            conn_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = conn_class(netloc, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self, scheme, netloc):
+        conn = self._local.conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, url, headers=None, method='GET', body_sink=None):
+        # GET (or HEAD) `url`, following redirects. Returns (status, headers, body).
+        # `body_sink()`, if given, opens a file that the body of a 200 is
+        # written to as it arrives (the returned body is then None); it is
+        # discard()ed if the transfer fails.
+        import http.client
+        for _ in range(self.max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ('http', 'https'):
+                # file:// and friends don't benefit from pooling
+                from urllib.request import urlopen
+                with urlopen(url, timeout=self.timeout) as f:
+                    return 200, {}, read_body(f, body_sink)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            request_headers = {'Accept-Encoding': 'identity'}
+            request_headers.update(headers or {})
+
+            # A pooled connection may have been closed by the server while
+            # idle; retry once on a fresh connection before giving up.
+            for attempt in range(2):
+                conn = self._connection(parts.scheme, parts.netloc)
+                try:
+                    conn.request(method, path, headers=request_headers)
+                    response = conn.getresponse()
+                    data = read_body(response, body_sink if response.status == 200 else None)
+                    break
+                except (http.client.HTTPException, ConnectionError, OSError):
+                    self._drop_connection(parts.scheme, parts.netloc)
+                    if attempt:
+                        raise
+            if response.will_close:
+                self._drop_connection(parts.scheme, parts.netloc)
+
+            if response.status in (301, 302, 303, 307, 308):
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                continue
+            return response.status, response.headers, data
+        raise OSError(f"Too many redirects fetching {url}")
+
+    def fetch(self, url):
+        status, headers, data = self.request(url)
+        if status != 200:
+            raise HTTPStatusError(status, url)
+        return data
+
+    def content_length(self, url):
+        # Size of the document from a HEAD request, or None if the server
+        # doesn't say (or `url` isn't http)
+        if urllib.parse.urlsplit(url).scheme not in ('http', 'https'):
+            return None
+        status, headers, _ = self.request(url, method='HEAD')
+        length = headers.get('Content-Length') if status == 200 else None
+        return int(length) if length is not None else None
+
+    def close(self):
+        for conn in getattr(self._local, 'conns', {}).values():
+            conn.close()
+        self._local.conns = {}
+
+# Mirror compression: the suffix of a mirrored body in each format. Statute
+# XML compresses about tenfold, so a compressed mirror is read back from
+# disk ten times faster, and it is decompressed as it is parsed rather
+# than into memory first. zstd comes from compression.zstd (Python 3.14)
+# or the zstandard package.
+MIRROR_COMPRESSION = {'none': '.xml', 'gzip': '.xml.gz', 'zstd': '.xml.zst'}
+
+def zstd_module():
+    # ImportError if neither is available
+    try:
+        from compression import zstd
+    except ImportError:
+        import zstandard as zstd
+    return zstd
+
+def open_compressed(path, compression, mode='rb'):
+    # Binary file that (de)compresses a chunk at a time as it is read or
+    # written
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == 'zstd':
+        return zstd_module().open(path, mode)
+    return open(path, mode)
+
+def path_compression(path):
+    # 'gzip' for A-1.xml.gz, ... ; 'none' for anything else
+    for compression, suffix in MIRROR_COMPRESSION.items():
+        if compression != 'none' and path.lower().endswith(suffix[len('.xml'):]):
+            return compression
+    return 'none'
+
+class MirroredXML:
+    # An act's XML left in the mirror instead of being read into memory:
+    # it pickles as its path, and the conversion process streams it into
+    # the parser, decompressing as it goes. The size and SHA-256 are of
+    # the uncompressed XML.
+    def __init__(self, path, compression, size, sha256):
+        self.path = path
+        self.compression = compression
+        self.size = size
+        self.sha256 = sha256
+
+    def open(self):
+        return open_compressed(self.path, self.compression)
+
+class MirrorWriter:
+    # One document being copied into the mirror, compressed, as it
+    # downloads. The previous copy stays in place until commit().
+    def __init__(self, mirror, url):
+        self.mirror = mirror
+        self.url = url
+        self.path = mirror._path(url) + MIRROR_COMPRESSION[mirror.compression]
+        self.f = open_compressed(self.path + '.tmp', mirror.compression, 'wb')
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.f.write(chunk)
+        self.hash.update(chunk)
+        self.size += len(chunk)
+
+    def discard(self):
+        self.f.close()
+        os.remove(self.path + '.tmp')
+
+    def commit(self, etag=None, last_modified=None):
+        # Body first, then the metadata that vouches for it; a copy in
+        # another format is removed last
+        self.f.close()
+        os.replace(self.path + '.tmp', self.path)
+        meta = {'url': self.url, 'etag': etag, 'last_modified': last_modified,
+                'compression': self.mirror.compression, 'size': self.size, 'sha256': self.hash.hexdigest()}
+        base = self.mirror._path(self.url)
+        with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(base + '.json.tmp', base + '.json')
+        for suffix in MIRROR_COMPRESSION.values():
+            if base + suffix != self.path and os.path.exists(base + suffix):
+                os.remove(base + suffix)
+        return meta
+
+class XMLMirror:
+    # On-disk copy of the raw XML, one file per URL, with the ETag and
+    # Last-Modified the server sent stored next to it so the next sync can
+    # ask "has this changed?" instead of downloading the act again. Bodies
+    # are stored with `compression` (see MIRROR_COMPRESSION); a copy
+    # stored otherwise, or by an older version that kept no size or hash,
+    # is rewritten the first time it is used.
+    def __init__(self, mirror_dir, compression='none'):
+        if compression == 'zstd':
+            zstd_module()
+        self.mirror_dir = mirror_dir
+        self.compression = compression
+        os.makedirs(mirror_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.mirror_dir, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def _meta(self, url):
+        try:
+            with open(self._path(url) + '.json', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _body(self, url, meta):
+        return self._path(url) + MIRROR_COMPRESSION[meta.get('compression', 'none')]
+
+    def validators(self, url):
+        meta = self._meta(url)
+        # Only trust validators whose body actually made it to disk
+        if not meta or not os.path.exists(self._body(url, meta)):
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def writer(self, url):
+        return MirrorWriter(self, url)
+
+    def get(self, url):
+        # -> MirroredXML; FileNotFoundError if `url` is not in the mirror
+        meta = self._meta(url)
+        compression = meta.get('compression', 'none')
+        if compression != self.compression or 'sha256' not in meta:
+            writer = self.writer(url)
+            try:
+                with open_compressed(self._body(url, meta), compression) as f:
+                    shutil.copyfileobj(f, writer)
+            except BaseException:
+                writer.discard()
+                raise
+            meta = writer.commit(meta.get('etag'), meta.get('last_modified'))
+        return self._mirrored(url, meta)
+
+    def _mirrored(self, url, meta):
+        return MirroredXML(self._body(url, meta), meta['compression'], meta['size'], meta['sha256'])
+
+    def size(self, url):
+        # Uncompressed size, or None if `url` is not mirrored
+        meta = self._meta(url)
+        if 'size' in meta:
+            return meta['size']
+        try:
+            return os.path.getsize(self._body(url, meta))
+        except OSError:
+            return None
+
+class MirroredFetcher:
+    # Wraps KeepAliveFetcher with an XMLMirror. Online, every request is
+    # conditional and a 304 is served from the mirror; offline, the network
+    # is never touched.
+    def __init__(self, fetcher, mirror, offline=False):
+        self.fetcher = fetcher
+        self.mirror = mirror
+        self.offline = offline
+        self.counts = {'downloaded': 0, 'not_modified': 0, 'offline': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def fetch(self, url):
+        # -> MirroredXML. Fresh downloads are streamed into the mirror and
+        # read back from there like a 304, and only if the act has to be
+        # converted, so no body is held in memory or sent to a worker.
+        if self.offline:
+            try:
+                data = self.mirror.get(url)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"{url} is not in the mirror") from None
+            self._count('offline')
+            return data
+
+        # A 200's body goes into the mirror as it arrives
+        writers = []
+        def body_sink():
+            writers.append(self.mirror.writer(url))
+            return writers[-1]
+        status, headers, _ = self.fetcher.request(url, self.mirror.validators(url), body_sink=body_sink)
+        if status == 304:
+            self._count('not_modified')
+            return self.mirror.get(url)
+        if status != 200:
+            raise HTTPStatusError(status, url)
+        meta = writers[-1].commit(headers.get('ETag'), headers.get('Last-Modified'))
+        self._count('downloaded')
+        return self.mirror._mirrored(url, meta)
+
+    def close(self):
+        self.fetcher.close()
+
+def converter_fingerprint():
+    # Any edit to this module can change the Markdown it produces, so the
+    # module's own bytes stand in for a converter version number.
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class BuildManifest:
+    # Remembers, per generated .md file, the SHA-256 of the XML it was built
+    # from and the converter fingerprint that built it. If both still match
+    # and the file is on disk, the act can be skipped without parsing,
+    # rendering or touching the output's mtime.
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _key(self, output_md_file):
+        return os.path.basename(output_md_file)
+
+    def is_current(self, output_md_file, xml_hash, other_outputs=(), output_exists=None):
+        # `output_exists` overrides the check for the .md file, for outputs
+        # kept somewhere else (a bundle)
+        entry = self.entries.get(self._key(output_md_file))
+        return (entry is not None
+                and entry['xml_sha256'] == xml_hash
+                and entry['converter'] == self.fingerprint
+                and (os.path.exists(output_md_file) if output_exists is None else output_exists)
+                and all(os.path.exists(path) for path in other_outputs))
+
+    def record(self, output_md_file, xml_hash, **history):
+        # `history` (XML size, conversion time) is kept for scheduling the
+        # next run and plays no part in is_current()
+        entry = dict(history, xml_sha256=xml_hash, converter=self.fingerprint)
+        with self._lock:
+            self.entries[self._key(output_md_file)] = entry
+        return entry
+
+    def restore(self, output_md_file, entry):
+        # Put back an entry recorded by an interrupted sync (see SyncJournal)
+        with self._lock:
+            self.entries[self._key(output_md_file)] = entry
+
+    def history(self, output_md_file):
+        return self.entries.get(self._key(output_md_file), {})
+
+    def save(self):
+        with self._lock:
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(self.path + '.tmp', self.path)
+
+class SyncJournal:
+    # Append-only log of a sync in progress, one JSON line per act as it
+    # settles, in <output dir>/.sync-journal.jsonl. The manifest is only
+    # saved once a sync completes; the journal is what survives a crash
+    # halfway. A journal without an "end" record belongs to a sync that was
+    # interrupted, and the next one resumes it: acts it settled under the
+    # same converter are neither downloaded nor converted again, and acts
+    # that failed are retried. `run` names the sync, a resumed one keeping
+    # the name of the sync it resumes.
+    def __init__(self, path):
+        self.path = path
+        self.failures = 0
+        self.run = None
+        self._started = None
+        self._torn = False
+        self._lock = threading.Lock()
+        self._file = None
+
+    def interrupted(self):
+        # {key: record} of the last sync's settled acts if it never
+        # finished, else None
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # The line being written when the process died, which the
+                # resumed sync starts on a fresh line after
+                continue
+        self._torn = bool(lines) and not lines[-1].endswith('\n')
+        if not records or records[-1].get('event') == 'end':
+            return None
+        self._started = records[0].get('time')
+        settled = {}
+        for record in records:
+            if record.get('status') in ('done', 'unchanged'):
+                settled[record['act']] = record
+            elif record.get('status') == 'failed':
+                settled.pop(record['act'], None)
+        return settled
+
+    def open(self, resume=False):
+        now = time.time()
+        started = self._started if resume and self._started is not None else now
+        self.run = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(started))
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._torn:
+            self._file.write('\n')
+        self._write({'event': 'resume' if resume else 'start', 'time': now})
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def settle(self, output_md_file, status, entry):
+        # `entry` is the act's manifest entry, restored from here on resume
+        self._write({'act': os.path.basename(output_md_file), 'status': status, 'entry': entry})
+
+    def fail(self, output_md_file, stage, error):
+        with self._lock:
+            self.failures += 1
+        self._write({'act': os.path.basename(output_md_file), 'status': 'failed', 'stage': stage,
+                     'error': str(error)})
+
+    def close(self, complete):
+        if complete:
+            self._write({'event': 'end', 'time': time.time(), 'failures': self.failures})
+        self._file.close()
+
+def xml_to_md(xml_file, output_md_file, xml_bytes=None, streaming=False, parser='stdlib', outputs=None):
+    # `outputs` maps further formats ('text', 'jsonl') to files to render in
+    # the same pass as the Markdown; see OUTPUT_FORMATS. Returns False if
+    # the XML could not be parsed, else True.
+    if streaming:
+        return stream_xml_to_md(xml_file, output_md_file, xml_bytes, parser, outputs)
+    parser = get_parser(parser)
+
+    # Parse the XML file. If the caller already downloaded it, parse the
+    # bytes it handed us instead of opening the URL again.
+    try:
+        if xml_bytes is not None:
+            root = parser.fromstring(xml_bytes)
+        else:
+            with open_xml(xml_file) as f:
+                root = parser.parse(f)
+    except Exception as e:
+        print(f"Error parsing XML from {xml_file}: {e}")
+        return False
+
+    # Render straight into the markdown file (and the other formats)
+    if outputs:
+        with contextlib.ExitStack() as stack:
+            write_targets(root, open_targets(stack, output_md_file, outputs))
+        return True
+    with open(output_md_file, 'w', encoding='utf-8') as f:
+        write_md(root, f)
+    return True
+
+def stream_xml_to_md(xml_file, output_md_file, xml_bytes=None, parser='stdlib', outputs=None):
+    # Same output as xml_to_md(), but written piece by piece while the XML
+    # is still being parsed, so the full tree is never held in memory.
+    try:
+        with contextlib.ExitStack() as stack:
+            if outputs:
+                targets = open_targets(stack, output_md_file, outputs)
+                render = lambda source: stream_targets(source, targets, parser)
+            else:
+                out = stack.enter_context(open(output_md_file, 'w', encoding='utf-8'))
+                render = lambda source: stream_md(source, out, parser)
+            if xml_bytes is not None:
+                render(io.BytesIO(xml_bytes))
+            else:
+                with open_xml(xml_file) as f:
+                    render(f)
+    except Exception as e:
+        print(f"Error parsing XML from {xml_file}: {e}")
+        # Don't leave half an act behind
+        for path in [output_md_file, *(outputs or {}).values()]:
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+    return True
+
+def open_xml(xml_file):
+    # A local file, decompressed as it is read if it is a .xml.gz or
+    # .xml.zst, or else a URL
+    if os.path.isfile(xml_file):
+        return open_compressed(xml_file, path_compression(xml_file))
+    from urllib.request import urlopen
+    return urlopen(xml_file)
+
+# The conversion processes get an act's XML either as bytes or as a
+# MirroredXML to stream from the mirror; these take either.
+
+def xml_stream(xml):
+    return xml.open() if isinstance(xml, MirroredXML) else io.BytesIO(xml)
+
+def parse_xml(xml, parser='stdlib'):
+    parser = get_parser(parser)
+    if isinstance(xml, MirroredXML):
+        with xml.open() as f:
+            return parser.parse(f)
+    return parser.fromstring(xml)
+
+def xml_size(xml):
+    return xml.size if isinstance(xml, MirroredXML) else len(xml)
+
+def xml_sha256(xml):
+    return xml.sha256 if isinstance(xml, MirroredXML) else hashlib.sha256(xml).hexdigest()
+
+def open_targets(stack, output_md_file, outputs):
+    # One target per format, each writing to its own file opened on `stack`
+    paths = {'md': output_md_file, **outputs}
+    return [OUTPUT_FORMATS[name](stack.enter_context(open(path, 'w', encoding='utf-8')))
+            for name, path in paths.items()]
+
+def xml_bytes_to_md(xml_bytes, streaming=False, parser='stdlib'):
+    # Parse + render only, no I/O. This is what the conversion processes run.
+    out = io.StringIO()
+    if streaming:
+        with xml_stream(xml_bytes) as source:
+            stream_md(source, out, parser)
+    else:
+        write_md(parse_xml(xml_bytes, parser), out)
+    return out.getvalue()
+
+# Output sinks. The handlers never build strings themselves; they call
+# out.write() with each fragment as soon as it is known. Anything with a
+# write() method works: an open file streams to disk, io.StringIO collects
+# the act in memory, and FragmentSink hands fragments back to a generator.
+
+class FragmentSink:
+    def __init__(self):
+        self.fragments = []
+
+    def write(self, fragment):
+        self.fragments.append(fragment)
+
+    def drain(self):
+        fragments, self.fragments = self.fragments, []
+        return fragments
+
+def render_md(root):
+    out = io.StringIO()
+    write_md(root, out)
+    return out.getvalue()
+
+def write_md(root, out):
+    dispatch(root, out, None)
+
+def stream_md(source, out, parser='stdlib'):
+    # Streaming counterpart of write_md()
+    for elem, parent in iter_top_level(source, parser):
+        dispatch(elem, out, parent)
+
+def iter_md(source, parser='stdlib'):
+    # Same as stream_md(), as a generator of Markdown fragments
+    sink = FragmentSink()
+    for elem, parent in iter_top_level(source, parser):
+        dispatch(elem, sink, parent)
+        yield from sink.drain()
+
+def iter_top_level(source, parser='stdlib'):
+    # iterparse builds the tree one element at a time. Each child of the
+    # root (Identification, Schedule, ...) is yielded with its parent once
+    # its end tag is seen and then dropped from the tree. Pure containers
+    # such as Body -- whose handler would only walk their children -- are
+    # never materialised whole: each of their children (Heading, Section,
+    # ...) is yielded as soon as it is complete instead. Memory stays at
+    # roughly one section regardless of the size of the act.
+    depth = 0
+    root = container = None
+    for event, elem in get_parser(parser).iterparse(source, ('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if depth == 1:
+                root = elem
+            elif depth == 2 and resolve_handler(root.tag, elem.tag) is render_children:
+                container = elem
+            continue
+
+        depth -= 1
+        if depth == 1:
+            if elem is not container:
+                yield elem, root
+            container = None
+            root.remove(elem)
+        elif depth == 2 and container is not None:
+            yield elem, container
+            container.remove(elem)
+
+def tree_top_level(root):
+    # iter_top_level() for a tree that has already been parsed whole
+    handlers = _resolved_handlers[root.tag]
+    for elem in root:
+        if handlers[elem.tag] is render_children:
+            for child in elem:
+                yield child, elem
+        else:
+            yield elem, root
+
+# Tag dispatch. Handlers are looked up by (parent tag, tag), falling back to
+# (None, tag) for handlers that apply under any parent, and finally to
+# skip(): like the v7 ladders, an element nothing is registered for is left
+# out along with everything under it, so a Paragraph is only rendered where
+# its owning line is. render_children() renders nothing itself but walks on
+# into the element, for containers such as Body whose children have
+# handlers of their own. Every handler is called as handler(elem, out,
+# parent). Lookups are resolved once per (parent, tag) pair and cached;
+# tags mapped to skip() are cached as None so walking past a Label or a
+# HistoricalNote costs a dict lookup rather than a function call.
+#
+# To render something new, register a handler before converting, e.g.
+#
+#     @register_handler('Provision', parent='Schedule')
+#     def handle_provision(provision, out, parent):
+#         out.write(f"{element_text(provision.find('Text'))}\n")
+#
+# and register_handler('Schedule', render_children) to walk into Schedules.
+
+TAG_HANDLERS = {}
+
+# Set by enable_handler_metrics(); see HandlerMetrics below
+_handler_metrics = None
+
+class _HandlerTable(dict):
+    # tag -> handler for the children of one parent tag
+    def __init__(self, parent_tag):
+        super().__init__()
+        self.parent_tag = parent_tag
+
+    def __missing__(self, tag):
+        handler = (TAG_HANDLERS.get((self.parent_tag, tag))
+                   or TAG_HANDLERS.get((None, tag))
+                   or skip)
+        if handler is skip:
+            handler = None
+        self[tag] = handler
+        return handler
+
+class _ResolvedHandlers(dict):
+    # parent tag -> _HandlerTable
+    def __missing__(self, parent_tag):
+        table = self[parent_tag] = _HandlerTable(parent_tag)
+        return table
+
+_resolved_handlers = _ResolvedHandlers()
+
+def register_handler(tag, handler=None, parent=None):
+    # Map `tag` (only when directly under `parent`, if given) to `handler`.
+    # Usable as a plain call or as a decorator.
+    def register(handler):
+        if _handler_metrics is not None:
+            handler = _handler_metrics.wrap(handler)
+        TAG_HANDLERS[(parent, tag)] = handler
+        _resolved_handlers.clear()
+        return handler
+    if handler is None:
+        return register
+    return register(handler)
+
+def resolve_handler(parent_tag, tag):
+    return _resolved_handlers[parent_tag][tag] or skip
+
+def dispatch(elem, out, parent):
+    handler = _resolved_handlers[parent.tag if parent is not None else None][elem.tag]
+    if handler:
+        handler(elem, out, parent)
+
+def render_children(elem, out, parent=None):
+    handlers = _resolved_handlers[elem.tag]
+    for child in elem:
+        handler = handlers[child.tag]
+        if handler:
+            handler(child, out, elem)
+
+def element_text(elem):
+    # ''.join(elem.itertext()), minus the generator for the common case of
+    # a Text element without inline markup
+    if len(elem):
+        return ''.join(elem.itertext())
+    return elem.text or ''
+
+def skip(elem, out, parent):
+    # Consumed by the parent's handler, or deliberately left out
+    pass
+
+# Most handlers come in two halves: extract_*(elem, parent) reads the fields
+# of one element's line out of the tree, and format_*(*fields) turns them
+# into Markdown. line_handler() joins the halves into an ordinary handler
+# and keeps them apart as well, so that the IR cache below can store just
+# the extracted fields and re-render them after a formatting change
+# without the XML. Every render goes through the same two halves.
+
+LINE_FORMATS = {}
+
+def line_handler(kind, extract, format, children=True):
+    # `children` says whether the element's children are walked after its
+    # own line: True, False, or a predicate on the element
+    # One closure per case, so the common ones pay for no test at all
+    if children is True:
+        def handler(elem, out, parent):
+            out.write(format(*extract(elem, parent)))
+            render_children(elem, out, parent)
+    elif children:
+        def handler(elem, out, parent):
+            out.write(format(*extract(elem, parent)))
+            if children(elem):
+                render_children(elem, out, parent)
+    else:
+        def handler(elem, out, parent):
+            out.write(format(*extract(elem, parent)))
+    handler.__name__ = f'handle_{kind}'
+    handler.line = (kind, extract, format, children)
+    LINE_FORMATS[kind] = format
+    return handler
+
+def extract_text_line(text, parent):
+    return (element_text(text),)
+
+def format_text_line(text):
+    return f"{text}\n"
+
+def extract_identification(identification, parent):
+    # Acts have a short title and a chapter; regulations usually have
+    # neither and are identified by their SOR/C.R.C. instrument number.
+    short_title = identification.find('ShortTitle')
+    chapter = identification.find('Chapter/ConsolidatedNumber')
+    instrument = identification.find('InstrumentNumber')
+    return (identification.find('LongTitle').text,
+            short_title.text if short_title is not None else None,
+            chapter.text if chapter is not None else None,
+            element_text(instrument) if instrument is not None else None)
+
+def format_identification(long_title, short_title, chapter, instrument):
+    lines = [f"# {long_title}\n"]
+    if short_title is not None:
+        lines.append(f"**Short Title:** {short_title}\n")
+    if chapter is not None:
+        lines.append(f"**Chapter:** {chapter}\n")
+    if instrument is not None:
+        lines.append(f"**Instrument Number:** {instrument}\n")
+    return ''.join(lines)
+
+def document_number(identification):
+    # "C-46" for an act, "SOR/2002-227" for a regulation
+    number = identification.find('Chapter/ConsolidatedNumber')
+    if number is None:
+        number = identification.find('InstrumentNumber')
+    return element_text(number) if number is not None else None
+
+def extract_heading(heading, parent):
+    title_text_element = heading.find('TitleText')
+    title = title_text_element.text if title_text_element is not None else ""
+    label = heading.find('Label')
+    return heading.get('level'), label.text if label is not None else None, title
+
+def format_heading(level, label, title):
+    label_text = f"{label} " if label is not None else ""
+    return f"{'#' * int(level)} {label_text}{title}\n"
+
+def extract_section(section, parent):
+    marginal_note = section.find('MarginalNote')
+    return section.find('Label').text, element_text(marginal_note) if marginal_note is not None else ''
+
+def format_section(label, marginal_note_text):
+    return f"#### {label}. {marginal_note_text}\n"
+
+def extract_subsection(subsection, parent):
+    marginal_note = subsection.find('MarginalNote')
+    return subsection.find('Label').text, element_text(marginal_note) if marginal_note is not None else ''
+
+def format_subsection(label, marginal_note_text):
+    return f"##### {label} {marginal_note_text}\n"
+
+def extract_continued_section_subsection(continued, parent):
+    return (element_text(continued.find('Text')),)
+
+def extract_definition(definition, parent):
+    # () when there is no Text, in which case only the nested paragraphs
+    # are rendered
+    text_elem = definition.find('Text')
+    if text_elem is None:
+        return ()
+    defined_term = text_elem.find('DefinedTermEn').text
+    tail = text_elem.find('DefinedTermEn').tail
+    definition_text = tail.strip() if tail else ""
+    # Remove any trailing French term if present
+    if definition_text and definition_text[-1] == '(':
+        definition_text = definition_text[:-1].strip()
+    return defined_term, definition_text
+
+def format_definition(defined_term=None, definition_text=None):
+    if definition_text is None:
+        return ''
+    return f"- **{defined_term}**{definition_text}\n"
+
+def extract_paragraph(paragraph, parent):
+    # remove possible french term
+    text_elem = paragraph.find('Text')
+    for fr in text_elem.findall('DefinedTermFr'):
+        fr.clear()
+    
+    para_text = element_text(text_elem)
+    if para_text and para_text[-1] == '(':
+        para_text = para_text[:-1].strip()
+    return paragraph.find('Label').text, para_text
+
+def format_paragraph(para_label, para_text):
+    return f"\t- {para_label} {para_text}\n"
+
+def extract_continued_paragraph(continued, paragraph):
+    return paragraph.find('Label').text, element_text(continued.find('Text'))
+
+def format_continued_paragraph(para_label, continued_text):
+    # Continued text goes on a new line with similar indenting
+    return f"\t  {' '*len(para_label)}{continued_text}\n"
+
+def extract_labelled_line(elem, parent):
+    # Label and Text of a Subparagraph or Clause, either of which may be missing
+    label_elem = elem.find('Label')
+    text_elem = elem.find('Text')
+    return (label_elem.text if label_elem is not None else "",
+            element_text(text_elem) if text_elem is not None else "")
+
+def format_subparagraph(subpara_label, subpara_text):
+    return f"\t\t- {subpara_label} {subpara_text}\n"
+
+def format_clause(clause_label, clause_text):
+    return f"\t\t\t- {clause_label} {clause_text}\n"
+
+def clause_has_more(clause):
+    # Most clauses are only a Label and a Text; walk the rest (Subclause,
+    # ContinuedClause, ...) only when there is something else there.
+    # Walking a Label or Text is harmless, as both are skipped.
+    n = len(clause)
+    if n == 2:
+        return clause[0].tag != 'Label' or clause[1].tag != 'Text'
+    return n > 2 or (n == 1 and clause[0].tag not in ('Label', 'Text'))
+
+def extract_continued_subparagraph(continued, parent):
+    text_elem = continued.find('Text')
+    return (element_text(text_elem) if text_elem is not None else "",)
+
+def format_continued_subparagraph(cont_text):
+    # Appended to the subparagraph's line
+    return f" {cont_text}"
+
+handle_text_line = line_handler('text_line', extract_text_line, format_text_line, children=False)
+handle_identification = line_handler('identification', extract_identification, format_identification,
+                                     children=False)
+handle_heading = line_handler('heading', extract_heading, format_heading)
+handle_section = line_handler('section', extract_section, format_section)
+handle_subsection = line_handler('subsection', extract_subsection, format_subsection)
+handle_continued_section_subsection = line_handler('continued_section_subsection',
+                                                   extract_continued_section_subsection, format_text_line,
+                                                   children=False)
+handle_definition = line_handler('definition', extract_definition, format_definition)
+handle_paragraph = line_handler('paragraph', extract_paragraph, format_paragraph)
+handle_continued_paragraph = line_handler('continued_paragraph', extract_continued_paragraph,
+                                          format_continued_paragraph, children=False)
+handle_subparagraph = line_handler('subparagraph', extract_labelled_line, format_subparagraph)
+handle_clause = line_handler('clause', extract_labelled_line, format_clause, children=clause_has_more)
+handle_continued_subparagraph = line_handler('continued_subparagraph', extract_continued_subparagraph,
+                                             format_continued_subparagraph, children=False)
+
+# Label, Text and MarginalNote are read by the handler of the element that
+# owns them; only Section and Subsection render Text children as lines.
+# What is registered here is what the v7 ladders rendered, plus the
+# Definitions of a Subsection, which v7 dropped.
+for tag in ('Label', 'Text', 'MarginalNote', 'TitleText', 'HistoricalNote'):
+    register_handler(tag, skip)
+for tag in ('Statute', 'Regulation', 'Body'):
+    register_handler(tag, render_children)
+register_handler('Identification', handle_identification)
+register_handler('Heading', handle_heading, parent='Body')
+register_handler('Section', handle_section, parent='Body')
+register_handler('Text', handle_text_line, parent='Section')
+register_handler('Subsection', handle_subsection, parent='Section')
+register_handler('Definition', handle_definition, parent='Section')
+register_handler('Paragraph', handle_paragraph, parent='Section')
+register_handler('Text', handle_text_line, parent='Subsection')
+register_handler('Definition', handle_definition, parent='Subsection')
+register_handler('Paragraph', handle_paragraph, parent='Subsection')
+register_handler('ContinuedSectionSubsection', handle_continued_section_subsection, parent='Subsection')
+register_handler('Paragraph', handle_paragraph, parent='Definition')
+register_handler('Subparagraph', handle_subparagraph, parent='Paragraph')
+register_handler('ContinuedParagraph', handle_continued_paragraph, parent='Paragraph')
+register_handler('Clause', handle_clause, parent='Subparagraph')
+register_handler('ContinuedSubparagraph', handle_continued_subparagraph, parent='Subparagraph')
+
+# Optional instrumentation. None of this runs unless enable_handler_metrics()
+# has been called; until then the registry holds the plain handlers, so an
+# ordinary conversion pays nothing for it.
+
+class HandlerMetrics:
+    # Per handler name: [calls, total seconds, self seconds]. Total includes
+    # the handlers it dispatched to; self time excludes them.
+    def __init__(self):
+        self.stats = {}
+        self._nested_time = []
+
+    def wrap(self, handler):
+        # skip() and render_children() are left alone: they do no rendering
+        # of their own, and iter_top_level() recognises containers by
+        # checking for render_children itself.
+        if handler is skip or handler is render_children or hasattr(handler, '__wrapped__'):
+            return handler
+        name = handler.__name__
+        stats = self.stats
+        nested_time = self._nested_time
+
+        def timed(elem, out, parent):
+            nested_time.append(0.0)
+            start = time.perf_counter()
+            try:
+                handler(elem, out, parent)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = nested_time.pop()
+                entry = stats.get(name)
+                if entry is None:
+                    entry = stats[name] = [0, 0.0, 0.0]
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += elapsed - nested
+                if nested_time:
+                    nested_time[-1] += elapsed
+        timed.__name__ = name
+        timed.__wrapped__ = handler
+        return timed
+
+    def take(self):
+        # Return the stats gathered so far and start again from zero
+        stats = dict(self.stats)
+        self.stats.clear()
+        return stats
+
+def enable_handler_metrics():
+    global _handler_metrics
+    if _handler_metrics is None:
+        _handler_metrics = HandlerMetrics()
+        for key, handler in TAG_HANDLERS.items():
+            TAG_HANDLERS[key] = _handler_metrics.wrap(handler)
+        _resolved_handlers.clear()
+    return _handler_metrics
+
+def xml_bytes_to_md_with_metrics(xml_bytes, streaming=False, parser='stdlib'):
+    # xml_bytes_to_md(), also returning parse/render time, element count and
+    # handler stats for this act. Used by the conversion processes when
+    # main() runs with --metrics.
+    handler_metrics = enable_handler_metrics()
+    handler_metrics.take()
+    out = io.StringIO()
+    metrics = {'bytes_in': xml_size(xml_bytes)}
+    if streaming:
+        # Parsing and rendering interleave; time spent waiting on iterparse
+        # is parse, time spent in the handlers is render.
+        parse_s = render_s = 0.0
+        elements = 0
+        with xml_stream(xml_bytes) as source:
+            items = iter_top_level(source, parser)
+            while True:
+                start = time.perf_counter()
+                item = next(items, None)
+                parse_s += time.perf_counter() - start
+                if item is None:
+                    break
+                elem, parent = item
+                elements += sum(1 for _ in elem.iter())
+                start = time.perf_counter()
+                dispatch(elem, out, parent)
+                render_s += time.perf_counter() - start
+    else:
+        start = time.perf_counter()
+        root = parse_xml(xml_bytes, parser)
+        parse_s = time.perf_counter() - start
+        elements = sum(1 for _ in root.iter())
+        start = time.perf_counter()
+        write_md(root, out)
+        render_s = time.perf_counter() - start
+    metrics.update(parse_s=parse_s, render_s=render_s, elements=elements, handlers=handler_metrics.take())
+    return out.getvalue(), metrics
+
+class MetricsLog:
+    # Writes one JSON line per converted act and keeps running totals for
+    # the summary printed at the end of main().
+    phases = ('fetch_s', 'parse_s', 'render_s', 'write_s')
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        self.acts = 0
+        self.totals = dict.fromkeys(self.phases + ('bytes_in', 'bytes_out', 'elements'), 0)
+        self.handlers = {}
+
+    def record(self, xml_link, output_md_file, metrics):
+        self.file.write(json.dumps({'type': 'act', 'act': xml_link, 'output': output_md_file, **metrics}) + '\n')
+        self.acts += 1
+        for key in self.totals:
+            self.totals[key] += metrics.get(key) or 0
+        for name, (calls, total, own) in metrics['handlers'].items():
+            entry = self.handlers.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += calls
+            entry[1] += total
+            entry[2] += own
+
+    def close(self):
+        self.file.write(json.dumps({'type': 'handlers', 'handlers': self.handlers}) + '\n')
+        self.file.close()
+
+    def print_summary(self):
+        print(f"\nMetrics for {self.acts} acts (per-act detail in {self.path})")
+        print(f"{'phase':<10}{'total s':>10}{'mean s':>10}")
+        for phase in self.phases:
+            total = self.totals[phase]
+            print(f"{phase[:-2]:<10}{total:>10.3f}{total / max(1, self.acts):>10.4f}")
+        print(f"bytes in {self.totals['bytes_in']:,}, bytes out {self.totals['bytes_out']:,}, "
+              f"elements {self.totals['elements']:,}")
+        print(f"{'handler':<38}{'calls':>10}{'total s':>10}{'self s':>10}")
+        for name, (calls, total, own) in sorted(self.handlers.items(), key=lambda item: -item[1][2]):
+            print(f"{name:<38}{calls:>10}{total:>10.3f}{own:>10.3f}")
+
+# Parse-once intermediate representation. Rendering an act only needs, for
+# each element that has a handler, the fields its extract_*() half reads --
+# one row per element, in document order, with the row of its parent:
+#
+#   kind      array of indexes into `kinds` ('section', 'paragraph', ...)
+#   parent    array of parent row numbers, -1 at the top
+#   starts    array of offsets into `fields`; row r owns starts[r]:starts[r + 1]
+#   fields    array of indexes into `strings`, -1 for None
+#   strings   every distinct string once (labels such as "(a)" repeat a lot)
+#
+# The columns are saved with marshal, keyed by the SHA-256 of the XML, and
+# re-rendered with the format_*() halves without parsing anything. A handler
+# registered without line_handler() gets a 'raw' row holding its output.
+
+IR_FORMAT = 1
+
+def _hash_code(func, h, seen):
+    # Bytecode, names and constants of `func` and of the module-level
+    # functions it calls, recursively; line numbers are left out so moving
+    # code around doesn't count as a change.
+    def visit(code):
+        h.update(code.co_code)
+        h.update(repr(code.co_names).encode('utf-8'))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                visit(const)
+            elif isinstance(const, frozenset):
+                h.update(repr(sorted(map(repr, const))).encode('utf-8'))
+            else:
+                h.update(repr(const).encode('utf-8'))
+        for name in code.co_names:
+            value = globals().get(name)
+            if isinstance(value, types.FunctionType) and value not in seen:
+                seen.add(value)
+                visit(value.__code__)
+    seen.add(func)
+    visit(func.__code__)
+
+def ir_fingerprint():
+    # Changes when what goes into the IR changes: the registry or any
+    # extract_*() half (or other non-line handler). Editing a format_*()
+    # half leaves it alone, which is the point of the cache.
+    h = hashlib.sha256(f"{IR_FORMAT}".encode('utf-8'))
+    seen = set()
+    for (parent, tag), handler in sorted(TAG_HANDLERS.items(), key=lambda item: (item[0][0] or '', item[0][1])):
+        handler = getattr(handler, '__wrapped__', handler)
+        h.update(f"{parent}/{tag}".encode('utf-8'))
+        line = getattr(handler, 'line', None)
+        if line is None:
+            h.update(handler.__name__.encode('utf-8'))
+            _hash_code(handler, h, seen)
+            continue
+        kind, extract, _, children = line
+        h.update(kind.encode('utf-8'))
+        _hash_code(extract, h, seen)
+        if callable(children):
+            _hash_code(children, h, seen)
+    return h.hexdigest()
+
+class DocumentIR:
+    def __init__(self, kinds, strings, kind, parent, starts, fields):
+        self.kinds = kinds
+        self.strings = strings
+        self.kind = kind
+        self.parent = parent
+        self.starts = starts
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.kind)
+
+    def dumps(self, fingerprint):
+        return marshal.dumps((IR_FORMAT, fingerprint, self.kinds, self.strings, self.kind.tobytes(),
+                              self.parent.tobytes(), self.starts.tobytes(), self.fields.tobytes()))
+
+    @classmethod
+    def loads(cls, data, fingerprint):
+        # None if `data` was written by a different extractor
+        version, stored_fingerprint, kinds, strings, *columns = marshal.loads(data)
+        if version != IR_FORMAT or stored_fingerprint != fingerprint:
+            return None
+        arrays = []
+        for typecode, column in zip('Hiii', columns):
+            arrays.append(array(typecode))
+            arrays[-1].frombytes(column)
+        return cls(kinds, strings, *arrays)
+
+    def rows(self):
+        # (kind, parent row, fields) per row
+        values = [self.strings[i] if i >= 0 else None for i in self.fields]
+        starts = self.starts
+        for row, (k, parent) in enumerate(zip(self.kind, self.parent)):
+            yield self.kinds[k], parent, values[starts[row]:starts[row + 1]]
+
+class LineWalker:
+    # Walks a tree exactly as dispatch() renders it, but hands each line's
+    # kind and extracted fields to line(), which returns the row number its
+    # children are attached to. Subclasses decide what a line becomes.
+    def line(self, kind, parent_row, fields):
+        raise NotImplementedError
+
+    def add(self, elem, parent, parent_row=-1):
+        # Visit `elem` the way dispatch(elem, out, parent) would render it
+        handler = _resolved_handlers[parent.tag if parent is not None else None][elem.tag]
+        if handler is None:
+            return
+        if handler is render_children:
+            for child in elem:
+                self.add(child, elem, parent_row)
+            return
+        line = getattr(getattr(handler, '__wrapped__', handler), 'line', None)
+        if line is None:
+            self.line('raw', parent_row, (render_element(elem, parent),))
+            return
+        kind, extract, _, children = line
+        row = self.line(kind, parent_row, extract(elem, parent))
+        if children is True or (children and children(elem)):
+            for child in elem:
+                self.add(child, elem, row)
+
+class IRBuilder(LineWalker):
+    def __init__(self):
+        self.kinds = {}
+        self.strings = {}
+        self.kind = array('H')
+        self.parent = array('i')
+        self.starts = array('i', [0])
+        self.fields = array('i')
+
+    def line(self, kind, parent_row, fields):
+        k = self.kinds.get(kind)
+        if k is None:
+            k = self.kinds[kind] = len(self.kinds)
+        self.kind.append(k)
+        self.parent.append(parent_row)
+        strings = self.strings
+        for value in fields:
+            if value is None:
+                self.fields.append(-1)
+                continue
+            i = strings.get(value)
+            if i is None:
+                i = strings[value] = len(strings)
+            self.fields.append(i)
+        self.starts.append(len(self.fields))
+        return len(self.kind) - 1
+
+    def finish(self):
+        return DocumentIR(list(self.kinds), list(self.strings), self.kind, self.parent, self.starts, self.fields)
+
+def build_ir(xml_bytes, streaming=False, parser='stdlib'):
+    # Parse step: XML -> DocumentIR. Streaming keeps one top-level element
+    # in memory at a time, as for stream_md().
+    builder = IRBuilder()
+    if streaming:
+        with xml_stream(xml_bytes) as source:
+            for elem, parent in iter_top_level(source, parser):
+                builder.add(elem, parent)
+    else:
+        builder.add(parse_xml(xml_bytes, parser), None)
+    return builder.finish()
+
+def write_ir_md(ir, out):
+    # Render step: the same Markdown write_md() produces, from the IR alone
+    formats = [LINE_FORMATS[kind] if kind != 'raw' else str for kind in ir.kinds]
+    values = [ir.strings[i] if i >= 0 else None for i in ir.fields]
+    starts = ir.starts
+    for row, k in enumerate(ir.kind):
+        out.write(formats[k](*values[starts[row]:starts[row + 1]]))
+
+def render_ir_md(ir):
+    out = io.StringIO()
+    write_ir_md(ir, out)
+    return out.getvalue()
+
+class IRCache:
+    # <cache_dir>/<sha256 of the XML>.ir; entries from an older extractor
+    # are treated as missing and overwritten
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.fingerprint = ir_fingerprint()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, xml_hash):
+        return os.path.join(self.cache_dir, xml_hash + '.ir')
+
+    def load(self, xml_hash):
+        try:
+            with open(self._path(xml_hash), 'rb') as f:
+                return DocumentIR.loads(f.read(), self.fingerprint)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+
+    def store(self, xml_hash, ir):
+        # Several processes may store the same act; each writes its own
+        # temporary file and the last rename wins
+        path = self._path(xml_hash)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(ir.dumps(self.fingerprint))
+        os.replace(tmp, path)
+
+    def get(self, xml_bytes, streaming=False, parser='stdlib'):
+        # -> (DocumentIR, whether it came from the cache)
+        xml_hash = xml_sha256(xml_bytes)
+        ir = self.load(xml_hash)
+        if ir is not None:
+            return ir, True
+        ir = build_ir(xml_bytes, streaming, parser)
+        self.store(xml_hash, ir)
+        return ir, False
+
+# Several output formats from one traversal. A target turns each line's
+# kind and fields into one format and writes it to its own sink; the
+# fields are extracted once (itertext() joins, French terms stripped, ...)
+# and shared by every target, so each output is the same as rendering that
+# format alone, for the cost of one walk of the tree.
+#
+#   md     Markdown, as write_md() renders it
+#   text   plain text for embedding: the same lines without Markdown markup
+#   jsonl  one record per line: kind, parent line number and the named fields
+
+# Plain-text overrides of LINE_FORMATS; other kinds are already plain
+def text_identification(long_title, short_title, chapter, instrument):
+    lines = [f"{long_title}\n"]
+    if short_title is not None:
+        lines.append(f"Short Title: {short_title}\n")
+    if chapter is not None:
+        lines.append(f"Chapter: {chapter}\n")
+    if instrument is not None:
+        lines.append(f"Instrument Number: {instrument}\n")
+    return ''.join(lines)
+
+def text_heading(level, label, title):
+    return f"{label} {title}\n" if label is not None else f"{title}\n"
+
+def text_section(label, marginal_note_text):
+    return f"{label}. {marginal_note_text}\n"
+
+def text_labelled_line(label, text):
+    return f"{label} {text}\n"
+
+def text_definition(defined_term=None, definition_text=None):
+    if definition_text is None:
+        return ''
+    return f"{defined_term} {definition_text}\n"
+
+def text_continued_paragraph(para_label, continued_text):
+    return f"{continued_text}\n"
+
+TEXT_FORMATS = {
+    'identification': text_identification,
+    'heading': text_heading,
+    'section': text_section,
+    'subsection': text_labelled_line,
+    'definition': text_definition,
+    'paragraph': text_labelled_line,
+    'continued_paragraph': text_continued_paragraph,
+    'subparagraph': text_labelled_line,
+    'clause': text_labelled_line,
+}
+
+# Field names of the JSONL records; kinds not listed get a 'fields' list
+JSONL_FIELDS = {
+    'raw': ('text',),
+    'text_line': ('text',),
+    'identification': ('long_title', 'short_title', 'chapter', 'instrument_number'),
+    'heading': ('level', 'label', 'title'),
+    'section': ('label', 'marginal_note'),
+    'subsection': ('label', 'marginal_note'),
+    'continued_section_subsection': ('text',),
+    'definition': ('term', 'text'),
+    'paragraph': ('label', 'text'),
+    'continued_paragraph': ('label', 'text'),
+    'subparagraph': ('label', 'text'),
+    'clause': ('label', 'text'),
+    'continued_subparagraph': ('text',),
+}
+
+class FormatTarget:
+    # Formats each line with a kind -> format_*() table
+    def __init__(self, out, overrides=None):
+        self.out = out
+        self.formats = dict(LINE_FORMATS, raw=str, **(overrides or {}))
+
+    def line(self, row, kind, parent_row, fields):
+        self.out.write(self.formats[kind](*fields))
+
+class JsonlTarget:
+    def __init__(self, out):
+        self.out = out
+        # json.dumps() with options builds a new encoder on every call
+        self.encode = json.JSONEncoder(ensure_ascii=False).encode
+
+    def line(self, row, kind, parent_row, fields):
+        record = {'kind': kind, 'parent': parent_row}
+        names = JSONL_FIELDS.get(kind)
+        if names is not None:
+            record.update(zip(names, fields))
+        else:
+            record['fields'] = list(fields)
+        self.out.write(self.encode(record) + '\n')
+
+OUTPUT_FORMATS = {
+    'md': FormatTarget,
+    'text': lambda out: FormatTarget(out, TEXT_FORMATS),
+    'jsonl': JsonlTarget,
+}
+
+class TargetWriter(LineWalker):
+    # Feeds every line to each target in turn; rows are numbered in
+    # document order, which is also the line number in the JSONL output
+    def __init__(self, targets):
+        self.targets = targets
+        self.rows = 0
+
+    def line(self, kind, parent_row, fields):
+        row = self.rows
+        self.rows += 1
+        for target in self.targets:
+            target.line(row, kind, parent_row, fields)
+        return row
+
+def write_targets(root, targets):
+    TargetWriter(targets).add(root, None)
+
+def stream_targets(source, targets, parser='stdlib'):
+    # Streaming counterpart of write_targets()
+    writer = TargetWriter(targets)
+    for elem, parent in iter_top_level(source, parser):
+        writer.add(elem, parent)
+
+def write_ir_targets(ir, targets):
+    # Same output as write_targets(), from a cached DocumentIR
+    writer = TargetWriter(targets)
+    for kind, parent_row, fields in ir.rows():
+        writer.line(kind, parent_row, fields)
+
+def xml_bytes_to_outputs(xml_bytes, formats=('md',), streaming=False, parser='stdlib', ir=None, targets=(),
+                         outs=None):
+    # -> {format: rendered text}, all from one traversal (or from `ir`).
+    # `targets` are fed in the same pass, after the formats; `outs` are the
+    # StringIOs to render into by format, if the caller needs them.
+    if outs is None:
+        outs = {name: io.StringIO() for name in formats}
+    targets = [OUTPUT_FORMATS[name](out) for name, out in outs.items()] + list(targets)
+    if ir is not None:
+        write_ir_targets(ir, targets)
+    elif streaming:
+        with xml_stream(xml_bytes) as source:
+            stream_targets(source, targets, parser)
+    else:
+        write_targets(parse_xml(xml_bytes, parser), targets)
+    return {name: out.getvalue() for name, out in outs.items()}
+
+class SectionSpans:
+    # Character span of each Section in the Markdown written to `out`, for
+    # the bundle's section index. Must come after the Markdown target, so
+    # out.tell() is the end of the line just written.
+    def __init__(self, out):
+        self.out = out
+        self.pos = 0
+        self.spans = {}
+        self.current = None
+        self.in_section = []
+
+    def line(self, row, kind, parent_row, fields):
+        start, self.pos = self.pos, self.out.tell()
+        inside = self.in_section[parent_row] if parent_row >= 0 else False
+        if kind == 'section' or not inside:
+            self._close(start)
+            if kind == 'section':
+                self.current = (fields[0], start)
+        self.in_section.append(kind == 'section' or inside)
+
+    def _close(self, end):
+        if self.current is not None:
+            label, start = self.current
+            self.spans.setdefault(label, (start, end))
+            self.current = None
+
+    def table(self):
+        self._close(self.pos)
+        return self.spans
+
+# Section-level deltas. Every Section and Subsection gets a fingerprint of
+# its XML, keyed by its label path ("3", "3(1)"), and the table is kept
+# next to the act. When the act is rebuilt, the new table is compared with
+# the old one and the added, removed and modified provisions are written
+# as its change set, so the stages downstream of a re-consolidation can
+# redo only those.
+#
+# The fingerprints cover the provision's whole subtree -- every element
+# and its text, whether or not the converter renders it -- so a change the
+# Markdown doesn't show (in a Definition it drops, a formula, a note) is
+# still reported, and a converter change reports none. Attributes are left
+# out: the lims:* dates on each element move with every consolidation.
+# Runs of whitespace count as one space.
+
+def hash_element(elem, h):
+    # Feed the tags and text under `elem`, with its structure, to `h`
+    h.update(f"\x1d{elem.tag}\x1f{' '.join((elem.text or '').split())}".encode('utf-8'))
+    for child in elem:
+        hash_element(child, h)
+        h.update(f"\x1e{' '.join((child.tail or '').split())}".encode('utf-8'))
+    h.update(b'\x1c')
+
+class SectionFingerprints:
+    # Collector for walk_act(). element() yields no records; the table is
+    # read from table() once the act has been walked.
+    def __init__(self):
+        self.hashes = {}
+
+    def _add(self, key, elem):
+        hash_element(elem, self.hashes.setdefault(key, hashlib.sha256()))
+
+    def element(self, elem, parent):
+        if elem.tag == 'Section':
+            label = elem.find('Label')
+            path = label.text if label is not None else ''
+            self._add(path, elem)
+            for subsection in elem.findall('Subsection'):
+                self._add(child_label_path(path, subsection), subsection)
+        return ()
+
+    def table(self):
+        # label path -> fingerprint, in document order
+        return {key: h.hexdigest()[:16] for key, h in self.hashes.items()}
+
+def section_changes(old, new):
+    # Change set between two fingerprint tables, each list in document order
+    return {'added': [key for key in new if key not in old],
+            'removed': [key for key in old if key not in new],
+            'modified': [key for key, fingerprint in new.items() if key in old and old[key] != fingerprint]}
+
+# Chunking for vector search. Sections are rendered with the same handlers
+# as the Markdown, and a section that fits the token budget is one chunk.
+# One that doesn't is split along its own structure -- into its header,
+# Subsections, Paragraphs, ... going only as deep as needed -- and the
+# pieces are packed back together in order up to the budget. Nothing is
+# ever cut mid-provision, so a single provision larger than the budget
+# becomes an oversized chunk of its own. Each chunk carries the act ID,
+# the heading breadcrumb and the label paths (e.g. 3(1)(a)) it covers.
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English statute text
+    return (len(text) + 3) // 4
+
+def render_element(elem, parent):
+    out = io.StringIO()
+    dispatch(elem, out, parent)
+    return out.getvalue()
+
+def child_label_path(path, child, term_tag='DefinedTermEn'):
+    label = child.find('Label')
+    if label is not None and label.text:
+        return f"{path}{label.text}"
+    term = child.find(f'Text/{term_tag}')
+    if term is not None and term.text:
+        return f"{path} [{term.text}]"
+    return path
+
+def split_units(elem, parent, path, max_tokens, count_tokens, label_path=child_label_path):
+    # -> [(label path, markdown, tokens)], in document order
+    text = render_element(elem, parent)
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return [(path, text, tokens)]
+
+    # Children whose handler is skip() (Label, MarginalNote, a Paragraph's
+    # Text, ...) are rendered by this element's own handler; the rest
+    # render themselves and can become units of their own.
+    handlers = _resolved_handlers[elem.tag]
+    own = [child for child in elem if handlers[child.tag] is None]
+    structural = [child for child in elem if handlers[child.tag] is not None]
+    if not structural:
+        return [(path, text, tokens)]
+
+    # The element's own lines (its label, marginal note, lead-in text)
+    shallow = elem.makeelement(elem.tag, elem.attrib)
+    shallow.extend(copy.deepcopy(child) for child in own)
+    head = render_element(shallow, parent)
+    units = [(path, head, count_tokens(head))] if head else []
+    for child in structural:
+        units.extend(split_units(child, elem, label_path(path, child), max_tokens, count_tokens, label_path))
+    return units
+
+def section_chunks(section, parent, max_tokens, count_tokens):
+    # Greedily pack consecutive units of one section into chunks
+    label = section.find('Label')
+    units = split_units(section, parent, label.text if label is not None else '', max_tokens, count_tokens)
+    chunk, size = [], 0
+    for unit in units:
+        if chunk and size + unit[2] > max_tokens:
+            yield chunk, size
+            chunk, size = [], 0
+        chunk.append(unit)
+        size += unit[2]
+    if chunk:
+        yield chunk, size
+
+def open_heading(headings, heading):
+    # Update the [(level, text)] breadcrumb of open headings for `heading`
+    level = int(heading.get('level', 1))
+    while headings and headings[-1][0] >= level:
+        headings.pop()
+    label = heading.find('Label')
+    title_text = heading.find('TitleText')
+    headings.append((level, ' '.join(element_text(e) for e in (label, title_text) if e is not None)))
+
+class ActChunks:
+    # Collector for walk_act(): element() takes the top-level elements of
+    # one act in document order and yields the chunk dicts of each Section.
+    # A French chunk's ID is qualified like its file: "A-1.fra:0".
+    def __init__(self, act_id=None, max_tokens=512, count_tokens=estimate_tokens, language='eng'):
+        self.act_id = act_id
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.language = language
+        self.title = None
+        self.headings = []  # [(level, text)] for the headings currently open
+        self.number = 0
+
+    def element(self, elem, parent):
+        if elem.tag == 'Identification':
+            if self.act_id is None:
+                self.act_id = document_number(elem)
+            short_title = elem.find('ShortTitle')
+            self.title = element_text(short_title) if short_title is not None else None
+        elif elem.tag == 'Heading':
+            open_heading(self.headings, elem)
+        elif elem.tag == 'Section':
+            label = elem.find('Label')
+            marginal_note = elem.find('MarginalNote')
+            suffix = FRENCH_SUFFIX if self.language == 'fra' else ''
+            for units, tokens in section_chunks(elem, parent, self.max_tokens, self.count_tokens):
+                labels = list(dict.fromkeys(path for path, _, _ in units))
+                yield {
+                    'id': f"{self.act_id}{suffix}:{self.number}",
+                    'act': self.act_id,
+                    'language': self.language,
+                    'title': self.title,
+                    'headings': [text for _, text in self.headings],
+                    'section': label.text if label is not None else None,
+                    'marginal_note': element_text(marginal_note) if marginal_note is not None else None,
+                    'labels': labels,
+                    'tokens': tokens,
+                    'text': ''.join(text for _, text, _ in units),
+                }
+                self.number += 1
+
+def iter_chunks(source, act_id=None, max_tokens=512, parser='stdlib', count_tokens=estimate_tokens, language='eng'):
+    # Stream chunk dicts for one act, one section in memory at a time
+    chunks = ActChunks(act_id, max_tokens, count_tokens, language)
+    for elem, parent in iter_top_level(source, parser):
+        yield from chunks.element(elem, parent)
+
+def chunk_xml(xml_file, output_jsonl_file, max_tokens=512, parser='stdlib', language='eng'):
+    # Single-act counterpart of xml_to_md() for chunks; False on failure
+    try:
+        with open_xml(xml_file) as f, open(output_jsonl_file, 'w', encoding='utf-8') as out:
+            for chunk in iter_chunks(f, None, max_tokens, parser, language=language):
+                out.write(json.dumps(chunk, ensure_ascii=False) + '\n')
+    except Exception as e:
+        print(f"Error chunking XML from {xml_file}: {e}")
+        return False
+    return True
+
+# Per-section records for the lexical (BM25) index, the cross-reference
+# graph and the defined-term index: each Section rendered by the normal
+# handlers, plus the provisions it cites and the terms it defines, one
+# record per section, written to <act>.sections.jsonl and indexed by
+# lexical_index.py, xref_graph.py and defined_terms.py.
+
+def section_xrefs(section, act_id):
+    # [[act, section or None]] cited by one Section, in order of first mention.
+    # XRefInternal holds a provision of the same act ("12", "2(1)"), which is
+    # kept at section level; XRefExternal links a whole act or regulation.
+    refs = {}
+    for elem in section.iter():
+        if elem.tag == 'XRefInternal':
+            text = ''.join(elem.itertext()).split('(')[0].split()
+            if text:
+                refs.setdefault((act_id, text[0]), None)
+        elif elem.tag == 'XRefExternal':
+            link = elem.get('link')
+            if link:
+                refs.setdefault((link, None), None)
+    return [list(ref) for ref in refs]
+
+# "The following definitions apply in this Act." / "In this Part,"
+DEFINITION_SCOPE_RE = re.compile(r'\bin (?:this|these) (act|regulations?|part|division|subdivision|subsection|section)\b',
+                                 re.IGNORECASE)
+
+# The French versions' lead-ins: "Les définitions qui suivent s'appliquent
+# à la présente loi." / "Dans la présente partie,". A French "section" is a
+# Division and an "article" a Section.
+FRENCH_DEFINITION_SCOPE_RE = re.compile(r'\b(?:à la|au|aux|dans la|dans le|dans les) présente?s? '
+                                        r'(loi|règlements?|partie|sous-section|section|article|paragraphe)\b',
+                                        re.IGNORECASE)
+FRENCH_SCOPES = {'loi': 'act', 'règlement': 'act', 'règlements': 'act', 'partie': 'part', 'section': 'division',
+                 'sous-section': 'subdivision', 'article': 'section', 'paragraphe': 'subsection'}
+
+def definition_scope(lead_in):
+    # act, part, division, subdivision, section or subsection, from the
+    # lead-in of either language; act when it names none of these
+    match = DEFINITION_SCOPE_RE.search(lead_in)
+    if match:
+        scope = match.group(1).lower()
+        return 'act' if scope.startswith('regulation') else scope
+    match = FRENCH_DEFINITION_SCOPE_RE.search(lead_in)
+    return FRENCH_SCOPES[match.group(1).lower()] if match else 'act'
+
+def section_definitions(section):
+    # [{term, scope, text}] for the terms defined in one Section, directly or
+    # in one of its Subsections. The scope is read from the lead-in Text of
+    # the element holding the Definitions and is one of act, part, division,
+    # subdivision, section or subsection; a lead-in that names none of these
+    # counts as act-wide.
+    definitions = []
+    for container in [section, *section.findall('Subsection')]:
+        found = container.findall('Definition')
+        if not found:
+            continue
+        lead_in = container.find('Text')
+        scope = definition_scope(element_text(lead_in)) if lead_in is not None else 'act'
+        for definition in found:
+            term = definition.find('Text/DefinedTermEn')
+            if term is None or not term.text:
+                continue
+            definitions.append({'term': term.text, 'scope': scope,
+                                'text': render_element(definition, section).strip()})
+    return definitions
+
+class ActSections:
+    # Collector for walk_act(): one record per Section
+    def __init__(self, act_id=None, language='eng'):
+        self.act_id = act_id
+        self.language = language
+        self.headings = []
+
+    def element(self, elem, parent):
+        if elem.tag == 'Identification':
+            if self.act_id is None:
+                self.act_id = document_number(elem)
+        elif elem.tag == 'Heading':
+            open_heading(self.headings, elem)
+        elif elem.tag == 'Section':
+            label = elem.find('Label')
+            marginal_note = elem.find('MarginalNote')
+            yield {
+                'act': self.act_id,
+                'language': self.language,
+                'section': label.text if label is not None else None,
+                'marginal_note': element_text(marginal_note) if marginal_note is not None else None,
+                'headings': [text for _, text in self.headings],
+                'text': render_element(elem, parent),
+                'xrefs': section_xrefs(elem, self.act_id),
+                'definitions': section_definitions(elem),
+            }
+
+def iter_sections(source, act_id=None, parser='stdlib', language='eng'):
+    sections = ActSections(act_id, language)
+    for elem, parent in iter_top_level(source, parser):
+        yield from sections.element(elem, parent)
+
+# Bilingual alignment. Each language version of an act is split into its
+# individual provisions (every Subsection, Paragraph, ... of every Section)
+# keyed by label path, and the two are paired on that key into
+# <act>.aligned.jsonl records sharing the ID "<act>/<label path>".
+
+class ActProvisions:
+    # Collector for walk_act(): [label path, markdown] for every provision,
+    # in document order. A definition is keyed by its English term in both
+    # languages; after FrenchParser's swap that is a French definition's
+    # DefinedTermFr.
+    def __init__(self, language='eng'):
+        term_tag = 'DefinedTermFr' if language == 'fra' else 'DefinedTermEn'
+        self.label_path = lambda path, child: child_label_path(path, child, term_tag)
+
+    def element(self, elem, parent):
+        if elem.tag == 'Section':
+            label = elem.find('Label')
+            path = label.text if label is not None else ''
+            for unit_path, text, _ in split_units(elem, parent, path, 0, estimate_tokens, self.label_path):
+                yield [unit_path, text]
+
+def iter_provisions(source, act_id=None, parser='stdlib', language='eng'):
+    provisions = ActProvisions(language)
+    for elem, parent in iter_top_level(source, get_parser(parser, language)):
+        yield from provisions.element(elem, parent)
+
+def align_provisions(act_id, eng, fra):
+    # Pair two lists of provisions by label path. Unlabelled pieces that
+    # share their parent's path (a ContinuedParagraph, ...) are joined to
+    # it first; a provision found in only one language is paired with None.
+    def by_path(provisions):
+        merged = {}
+        for path, text in provisions:
+            merged[path] = merged.get(path, '') + text
+        return merged
+    eng, fra = by_path(eng), by_path(fra)
+    for path in list(eng) + [path for path in fra if path not in eng]:
+        yield {'id': f"{act_id}/{path}", 'act': act_id, 'path': path, 'eng': eng.get(path), 'fra': fra.get(path)}
+
+# One parse per act. Everything convert_act() produces is fed from a single
+# walk: LineWalkers (TargetWriter, IRBuilder, DispatchWalker) get each
+# top-level element to render, then the collectors above (ActChunks,
+# ActSections, ActProvisions, SectionFingerprints) read the same element
+# for their records.
+
+class DispatchWalker:
+    # Markdown straight from dispatch(), for walk_act() when no other
+    # format or target is wanted
+    def __init__(self, out):
+        self.out = out
+
+    def add(self, elem, parent):
+        dispatch(elem, self.out, parent)
+
+def walk_act(xml, walkers=(), collectors=None, streaming=False, parser='stdlib'):
+    # -> {name: [records]} for the `collectors` by name
+    collectors = collectors or {}
+    records = {name: [] for name in collectors}
+    if streaming:
+        with xml_stream(xml) as source:
+            for elem, parent in iter_top_level(source, parser):
+                for walker in walkers:
+                    walker.add(elem, parent)
+                for name, collector in collectors.items():
+                    records[name].extend(collector.element(elem, parent))
+    else:
+        root = parse_xml(xml, parser)
+        for walker in walkers:
+            walker.add(root, None)
+        if collectors:
+            for elem, parent in tree_top_level(root):
+                for name, collector in collectors.items():
+                    records[name].extend(collector.element(elem, parent))
+    return records
+
+class ConversionWatchdog:
+    # Per-act time limit inside a conversion process, so one pathological
+    # document fails on its own instead of holding a process for the rest
+    # of the sync. A timer thread interrupts the main thread the way Ctrl-C
+    # would (SIGALRM does not exist on Windows); the SIGINT handler turns
+    # the interrupt into a TimeoutError if it is meant for the act still
+    # being converted, and into the usual KeyboardInterrupt if it is a real
+    # Ctrl-C. A long call into C (one huge parse) is only interrupted once
+    # it returns.
+    _installed = None
+
+    def __init__(self):
+        self.armed = self.fired = None
+        self.seconds = None
+        self._tokens = 0
+        signal.signal(signal.SIGINT, self._interrupt)
+
+    @classmethod
+    def get(cls):
+        # One per process; None outside the main thread, where signal
+        # handlers cannot be installed
+        if cls._installed is None and threading.current_thread() is threading.main_thread():
+            cls._installed = cls()
+        return cls._installed
+
+    def _interrupt(self, signum, frame):
+        fired, self.fired = self.fired, None
+        if fired is None:
+            raise KeyboardInterrupt
+        # A timer that went off just as its act finished is ignored
+        if fired == self.armed:
+            self.armed = None
+            raise TimeoutError(f"conversion took longer than {self.seconds:g}s")
+
+    def _fire(self, token):
+        self.fired = token
+        _thread.interrupt_main()
+
+    @contextlib.contextmanager
+    def limit(self, seconds):
+        self._tokens += 1
+        self.armed, self.seconds = self._tokens, seconds
+        timer = threading.Timer(seconds, self._fire, (self._tokens,))
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        finally:
+            self.armed = None
+            timer.cancel()
+
+def time_limit(seconds):
+    watchdog = ConversionWatchdog.get() if seconds else None
+    return watchdog.limit(seconds) if watchdog is not None else contextlib.nullcontext()
+
+def convert_act(xml_bytes, act_id, options, language='eng'):
+    # Everything a conversion process does for one act. Returns a dict with
+    # the Markdown and whatever else `options` asked for.
+    with time_limit(options.get('act_timeout')):
+        start = time.perf_counter()
+        streaming = options['streaming']
+        parser = get_parser(options['parser'], language)
+        result = {'xml_bytes': xml_size(xml_bytes)}
+        formats = tuple(options.get('formats') or ())
+        outs = {name: io.StringIO() for name in ('md',) + formats}
+        targets = [OUTPUT_FORMATS[name](out) for name, out in outs.items()]
+        spans = None
+        if options.get('section_spans'):
+            spans = SectionSpans(outs['md'])
+            targets.append(spans)
+        collectors = {}
+        fingerprints = None
+        if options.get('deltas'):
+            fingerprints = collectors['fingerprints'] = SectionFingerprints()
+        if options.get('chunk_tokens'):
+            collectors['chunks'] = ActChunks(act_id, options['chunk_tokens'], language=language)
+        if options.get('sections'):
+            collectors['sections'] = ActSections(act_id, language)
+        if options.get('bilingual'):
+            collectors['provisions'] = ActProvisions(language)
+        # Only the Markdown, with nothing else riding along: plain dispatch()
+        md_only = len(targets) == 1
+
+        walkers = []
+        ir = builder = None
+        if options.get('metrics'):
+            result['md'], result['metrics'] = xml_bytes_to_md_with_metrics(xml_bytes, streaming, parser)
+            # The instrumented render is Markdown only; the rest take a
+            # second pass
+            if not md_only:
+                walkers.append(TargetWriter(targets))
+        elif options.get('ir_cache'):
+            cache = IRCache(options['ir_cache'])
+            xml_hash = xml_sha256(xml_bytes)
+            ir = cache.load(xml_hash)
+            result['ir_cached'] = ir is not None
+            if ir is None:
+                builder = IRBuilder()
+                walkers.append(builder)
+        elif md_only:
+            walkers.append(DispatchWalker(outs['md']))
+        else:
+            walkers.append(TargetWriter(targets))
+
+        if walkers or collectors:
+            result.update(walk_act(xml_bytes, walkers, collectors, streaming, parser))
+        if builder is not None:
+            ir = builder.finish()
+            cache.store(xml_hash, ir)
+        if ir is not None:
+            if md_only:
+                write_ir_md(ir, outs['md'])
+            else:
+                write_ir_targets(ir, targets)
+        if 'md' not in result:
+            result['md'] = outs['md'].getvalue()
+        if formats:
+            result['outputs'] = {name: outs[name].getvalue() for name in formats}
+        if fingerprints is not None:
+            result['fingerprints'] = fingerprints.table()
+        if spans is not None:
+            result['section_spans'] = spans.table()
+        result['convert_s'] = time.perf_counter() - start
+        return result
+
+def fetch_worker(fetcher, jobs, fetched, retries=0, backoff=1.0):
+    # Download stage: pull (url, output) jobs and push the raw XML onto the
+    # bounded `fetched` queue. put() blocks when the converter falls behind,
+    # which caps how many downloaded acts are held in memory at once.
+    # Transient failures are retried up to `retries` times, waiting
+    # `backoff` seconds and doubling it each time; data is None on failure.
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        xml_link, output_md_file = job
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                data, error = fetcher.fetch(xml_link), None
+                break
+            except Exception as e:
+                data, error = None, e
+                if attempt == retries or not transient_error(e):
+                    break
+                delay = backoff * 2 ** attempt
+                print(f"Error downloading {xml_link}: {e}; retrying in {delay:g}s")
+                time.sleep(delay)
+        if error is not None:
+            print(f"Error downloading {xml_link}: {error}")
+        fetched.put((xml_link, output_md_file, data, time.perf_counter() - start, error))
+    fetcher.close()
+    fetched.put(None)
+
+def chunks_path(output_md_file):
+    return os.path.splitext(output_md_file)[0] + '.chunks.jsonl'
+
+def sections_path(output_md_file):
+    return os.path.splitext(output_md_file)[0] + '.sections.jsonl'
+
+def fingerprints_path(output_md_file):
+    return os.path.splitext(output_md_file)[0] + '.fingerprints.json'
+
+def changes_path(output_md_file):
+    return os.path.splitext(output_md_file)[0] + '.changes.json'
+
+def write_deltas(output_md_file, table, run=None):
+    # Replace the act's fingerprint table and write the change set against
+    # the previous one; with no previous table every provision is added.
+    # The change set is stamped with the sync that found it, since it stays
+    # on disk through later runs in which the act does not change.
+    try:
+        with open(fingerprints_path(output_md_file), encoding='utf-8') as f:
+            old = json.load(f)
+    except (OSError, ValueError):
+        old = {}
+    changes = dict(act=os.path.basename(act_base(output_md_file)), language=output_language(output_md_file),
+                   run=run, **section_changes(old, table))
+    for path, data in ((fingerprints_path(output_md_file), table), (changes_path(output_md_file), changes)):
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+    return changes
+
+# Every act a sync found changed sections in, rewritten by each sync with
+# --deltas, so an act missing from it did not change in the latest run
+RUN_CHANGES = 'sync-changes.json'
+
+def write_run_changes(path, run, changes):
+    changes = sorted(changes, key=lambda c: (c['act'], c['language']))
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'run': run, 'acts': changes}, f, indent=1, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+OUTPUT_EXTENSIONS = {'md': '.md', 'text': '.txt', 'jsonl': '.lines.jsonl'}
+
+def format_path(output_md_file, name):
+    # <act>.txt, <act>.lines.jsonl, ... next to <act>.md
+    return os.path.splitext(output_md_file)[0] + OUTPUT_EXTENSIONS[name]
+
+# French outputs sit next to the English ones as <act>.fra.md,
+# <act>.fra.chunks.jsonl, ...
+FRENCH_SUFFIX = '.fra'
+
+# Regulations are filed under their French designations on the French
+# side: SOR-2000-1.xml is DORS-2000-1.xml, SI-2000-1.xml is TR-2000-1.xml
+# and C.R.C.,_c._870.xml is C.R.C.,_ch._870.xml
+FRENCH_FILE_PREFIXES = (('SOR-', 'DORS-'), ('SI-', 'TR-'))
+
+def french_link(xml_link):
+    # The /fra/XML/ link of an /eng/XML/ one, or None for any other link
+    if '/eng/XML/' not in xml_link:
+        return None
+    head, _, filename = xml_link.replace('/eng/XML/', '/fra/XML/').rpartition('/')
+    for english, french in FRENCH_FILE_PREFIXES:
+        if filename.startswith(english):
+            filename = french + filename[len(english):]
+            break
+    if filename.startswith('C.R.C.'):
+        filename = filename.replace('_c._', '_ch._', 1)
+    return f'{head}/{filename}'
+
+def url_language(xml_link):
+    return 'fra' if '/fra/' in urllib.parse.urlsplit(xml_link).path.lower() else 'eng'
+
+def output_language(output_md_file):
+    return 'fra' if os.path.splitext(output_md_file)[0].endswith(FRENCH_SUFFIX) else 'eng'
+
+def act_base(output_md_file):
+    # Output path without extension or language suffix: "dir/A-1" for both
+    # dir/A-1.md and dir/A-1.fra.md
+    base = os.path.splitext(output_md_file)[0]
+    return base[:-len(FRENCH_SUFFIX)] if base.endswith(FRENCH_SUFFIX) else base
+
+def provisions_path(output_md_file):
+    return os.path.splitext(output_md_file)[0] + '.provisions.jsonl'
+
+def aligned_path(output_md_file):
+    return act_base(output_md_file) + '.aligned.jsonl'
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def alignment_sides(output_md_file):
+    # The English and French provisions an act's pairing is made from
+    base = act_base(output_md_file)
+    return provisions_path(base + '.md'), provisions_path(base + FRENCH_SUFFIX + '.md')
+
+def write_alignment(output_md_file):
+    # Re-pair an act once both languages' provisions are on disk. Either
+    # side may be from an earlier run if its XML has not changed since.
+    eng_path, fra_path = alignment_sides(output_md_file)
+    if os.path.exists(eng_path) and os.path.exists(fra_path):
+        act_id = os.path.basename(act_base(output_md_file))
+        write_jsonl(aligned_path(output_md_file),
+                    align_provisions(act_id, read_jsonl(eng_path), read_jsonl(fra_path)))
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def bundle_key(output_md_file):
+    # "A-1", "A-1.fra": the act's entry in a bundle instead of its .md file
+    return os.path.splitext(os.path.basename(output_md_file))[0]
+
+def write_act(result, output_md_file, bundle=None, changes=None, run=None):
+    # Every output of one converted act; returns the Markdown's size
+    if bundle is not None:
+        written = bundle.offset
+        bundle.add_text(bundle_key(output_md_file), result['md'], result.get('section_spans'))
+        bytes_out = bundle.offset - written
+    else:
+        with open(output_md_file, 'w', encoding='utf-8') as f:
+            f.write(result['md'])
+        bytes_out = os.path.getsize(output_md_file)
+    for name, text in result.get('outputs', {}).items():
+        with open(format_path(output_md_file, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+    if 'chunks' in result:
+        write_jsonl(chunks_path(output_md_file), result['chunks'])
+    if 'sections' in result:
+        write_jsonl(sections_path(output_md_file), result['sections'])
+    if 'provisions' in result:
+        write_jsonl(provisions_path(output_md_file), result['provisions'])
+        write_alignment(output_md_file)
+    if 'fingerprints' in result:
+        changes.append(write_deltas(output_md_file, result['fingerprints'], run))
+    return bytes_out
+
+def write_worker(rendered, slots, manifest, rebuilt, metrics_log=None, changes=None, bundle=None, journal=None,
+                 run=None):
+    # Write stage: save each act as soon as its conversion finishes, in
+    # completion order, and free its slot so another act can be submitted.
+    # With a bundle, the Markdown is appended to it instead of a file.
+    # Each act is journaled once all of its outputs are written. An act
+    # that can't be written is reported and left out of the manifest, so
+    # the next run converts it again; the thread carries on either way,
+    # since main() waits on the slot it frees.
+    while True:
+        item = rendered.get()
+        if item is None:
+            break
+        xml_link, output_md_file, xml_hash, fetch_s, future = item
+        try:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error parsing XML from {xml_link}: {e}")
+                if journal is not None:
+                    journal.fail(output_md_file, 'convert', e)
+                continue
+            start = time.perf_counter()
+            try:
+                bytes_out = write_act(result, output_md_file, bundle, changes, run)
+            except Exception as e:
+                print(f"Error writing {output_md_file}: {e}")
+                if journal is not None:
+                    journal.fail(output_md_file, 'write', e)
+                continue
+            if metrics_log is not None:
+                metrics = result['metrics']
+                metrics.update(fetch_s=fetch_s, write_s=time.perf_counter() - start, bytes_out=bytes_out)
+                metrics_log.record(xml_link, output_md_file, metrics)
+            entry = manifest.record(output_md_file, xml_hash, xml_bytes=result['xml_bytes'],
+                                    convert_s=result['convert_s'])
+            if journal is not None:
+                journal.settle(output_md_file, 'done', entry)
+            rebuilt.append(output_md_file)
+            print(f"Generated {output_md_file}")
+        finally:
+            slots.release()
+
+# Scheduling. Most acts and regulations are a few kilobytes of XML, but a
+# few are tens of megabytes; if one of those comes up last in CSV order, a
+# single process is still converting it long after the others ran out of
+# work. Jobs are therefore queued longest-processing-time first, with the
+# XML size standing in for the time: taken from the previous run's
+# manifest entry, else the mirror, else an HTTP HEAD. Documents of unknown
+# size go first, since nothing says they are small.
+
+def estimate_sizes(job_list, manifest, mirror=None, fetcher=None, concurrency=8):
+    # -> ({output_md_file: bytes or None}, {source: count})
+    from concurrent.futures import ThreadPoolExecutor
+    sizes = {}
+    sources = {'history': 0, 'mirror': 0, 'head': 0, 'unknown': 0}
+    missing = []
+    for xml_link, output_md_file in job_list:
+        size = manifest.history(output_md_file).get('xml_bytes')
+        source = 'history'
+        if size is None and mirror is not None:
+            size, source = mirror.size(xml_link), 'mirror'
+        if size is None:
+            missing.append((xml_link, output_md_file))
+            continue
+        sizes[output_md_file] = size
+        sources[source] += 1
+
+    def head(job):
+        try:
+            return fetcher.content_length(job[0])
+        except Exception:
+            return None
+    if missing and fetcher is not None:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for (_, output_md_file), size in zip(missing, pool.map(head, missing)):
+                sizes[output_md_file] = size
+                sources['head' if size is not None else 'unknown'] += 1
+        fetcher.close()
+    else:
+        for _, output_md_file in missing:
+            sizes[output_md_file] = None
+            sources['unknown'] += 1
+    return sizes, sources
+
+def longest_first(job_list, sizes):
+    # Unknown sizes first, then largest to smallest; ties keep CSV order
+    return sorted(job_list, key=lambda job: (sizes[job[1]] is not None, -(sizes[job[1]] or 0)))
+
+def simulated_makespan(durations, workers):
+    # Greedy list scheduling, as the pool does it: each job in turn goes to
+    # whichever worker frees up first
+    finish = [0.0] * workers
+    for duration in durations:
+        heapq.heappush(finish, heapq.heappop(finish) + duration)
+    return max(finish)
+
+def iter_xml_links(csv_files):
+    # The 'xml_link' column of each CSV file in turn, a row at a time
+    for csv_file in csv_files:
+        with open(csv_file, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            if 'xml_link' not in (reader.fieldnames or ()):
+                raise ValueError(f"'{csv_file}' has no 'xml_link' column")
+            try:
+                for row in reader:
+                    if row['xml_link']:
+                        yield row['xml_link']
+            except csv.Error as e:
+                raise ValueError(f"'{csv_file}' line {reader.line_num}: {e}") from e
+
+def main(csv_file='All Acts.csv', output_dir='md files', concurrency=8, processes=None, streaming=False,
+         mirror_dir=None, offline=False, force=False, parser='stdlib', metrics_file=None,
+         chunk_tokens=None, bm25_dir=None, xrefs_dir=None, terms_dir=None, bilingual=False,
+         schedule='longest-first', ir_cache_dir=None, formats=None, deltas=False, bundle_file=None,
+         bundle_sections=False, retries=3, act_timeout=300, restart=False, mirror_compression='gzip'):
+    # Create the output directory if it doesn't exist
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # Read the CSV file(s): acts, regulations or both, each with an
+    # 'xml_link' column
+    csv_files = [csv_file] if isinstance(csv_file, str) else csv_file
+    try:
+        xml_links = list(iter_xml_links(csv_files))
+    except FileNotFoundError as e:
+        print(f"Error: '{e.filename}' not found.")
+        return
+    except (OSError, ValueError) as e:
+        print(f"Error reading CSV: {e}")
+        return
+
+    # Every document in the 'xml_link' column, in CSV order
+    concurrency = max(1, concurrency)
+    parser = get_parser(parser).name
+    processes = processes or os.cpu_count() or 1
+    job_list = []
+    for xml_link in xml_links:
+        # Extract filename from the URL
+        filename = xml_link.split('/')[-1].replace('.xml', '').replace('.XML', '')
+        output_md_file = os.path.join(output_dir, f'{filename}.md')
+        job_list.append((xml_link, output_md_file))
+
+        # Queue the French version right behind the English one, so the two
+        # go through the pool side by side and pair up as soon as possible
+        if bilingual:
+            fra_link = french_link(xml_link)
+            if fra_link is None:
+                print(f"Error: no French version known for {xml_link} (expected an /eng/XML/ link).")
+                continue
+            job_list.append((fra_link, os.path.join(output_dir, f'{filename}{FRENCH_SUFFIX}.md')))
+
+    # Three stages: download threads -> conversion processes -> writer thread.
+    # `fetched` and `slots` bound how much raw XML and rendered Markdown can
+    # pile up between stages.
+    fetcher = KeepAliveFetcher()
+    if mirror_dir:
+        try:
+            mirror = XMLMirror(mirror_dir, mirror_compression)
+        except ImportError:
+            print("Error: --mirror-compression zstd needs Python 3.14 or the zstandard package "
+                  "(pip install zstandard).")
+            return
+        fetcher = MirroredFetcher(fetcher, mirror, offline)
+    elif offline:
+        print("Error: --offline needs a --mirror directory to read from.")
+        return
+    if bundle_sections and not bundle_file:
+        print("Error: --bundle-sections needs a --bundle file to index.")
+        return
+    fetched = queue.Queue(maxsize=concurrency * 2)
+    rendered = queue.Queue()
+    slots = threading.Semaphore(processes * 2)
+    # Chunks depend on the token budget as well as on the converter, and
+    # switching an extra output on has to rebuild acts that lack it
+    fingerprint = converter_fingerprint()
+    if chunk_tokens:
+        fingerprint += f":chunks={chunk_tokens}"
+    sections = bool(bm25_dir or xrefs_dir or terms_dir)
+    if sections:
+        fingerprint += ":sections"
+    if bilingual:
+        fingerprint += ":bilingual"
+    formats = [name for name in formats or () if name != 'md']
+    if formats:
+        fingerprint += f":formats={','.join(sorted(formats))}"
+    if deltas:
+        fingerprint += ":deltas"
+    if bundle_sections:
+        fingerprint += ":bundle-sections"
+    manifest = BuildManifest(os.path.join(output_dir, '.build-manifest.json'), fingerprint)
+
+    def other_outputs(output_md_file):
+        paths = [chunks_path(output_md_file)] if chunk_tokens else []
+        if sections:
+            paths.append(sections_path(output_md_file))
+        if bilingual:
+            paths.append(provisions_path(output_md_file))
+            # An act with no French version (its download 404s) has nothing
+            # to pair: the pairing is only owed once both sides exist
+            if all(os.path.exists(path) for path in alignment_sides(output_md_file)):
+                paths.append(aligned_path(output_md_file))
+        paths += [format_path(output_md_file, name) for name in formats]
+        if deltas:
+            paths.append(fingerprints_path(output_md_file))
+        return paths
+
+    # Pick up where an interrupted sync stopped: what it settled under this
+    # converter goes back into the manifest and drops out of this run. A
+    # bundle is rewritten whole, so it can't be resumed.
+    journal = SyncJournal(os.path.join(output_dir, '.sync-journal.jsonl'))
+    settled = None if restart else journal.interrupted()
+    restored = []
+    if settled is not None and bundle_file:
+        print("Not resuming the interrupted sync: a bundle is rebuilt from scratch.")
+        settled = None
+    if settled is not None:
+        remaining = []
+        for xml_link, output_md_file in job_list:
+            entry = settled.get(os.path.basename(output_md_file), {}).get('entry')
+            if (entry is not None and entry['converter'] == fingerprint and os.path.exists(output_md_file)
+                    and all(os.path.exists(path) for path in other_outputs(output_md_file))):
+                manifest.restore(output_md_file, entry)
+                restored.append(output_md_file)
+            else:
+                remaining.append((xml_link, output_md_file))
+        print(f"Resuming an interrupted sync: {len(job_list) - len(remaining)} acts already done, "
+              f"{len(remaining)} to go")
+        job_list = remaining
+    journal.open(resume=settled is not None)
+
+    # Packed output: acts rebuilt this run are appended to a new bundle as
+    # they finish, and the rest are carried over from the old one at the end
+    old_bundle = bundle_writer = None
+    if bundle_file:
+        import bundle
+        if os.path.exists(bundle_file):
+            try:
+                old_bundle = bundle.Bundle(bundle_file)
+            except ValueError as e:
+                print(f"Error: {e}; rebuilding it.")
+        bundle_writer = bundle.BundleWriter(bundle_file + '.tmp')
+
+    # Queue the jobs for the download workers, biggest documents first
+    run_order = job_list
+    if schedule == 'longest-first':
+        sizes, sources = estimate_sizes(job_list, manifest, fetcher.mirror if mirror_dir else None,
+                                        None if offline else KeepAliveFetcher(), concurrency)
+        run_order = longest_first(job_list, sizes)
+        print(f"Scheduling longest first; sizes from {sources['history']} previous runs, {sources['mirror']} "
+              f"mirrored files, {sources['head']} HEAD requests, {sources['unknown']} unknown")
+    jobs = queue.Queue()
+    for job in run_order:
+        jobs.put(job)
+    for _ in range(concurrency):
+        jobs.put(None)
+    rebuilt, unchanged, changes = [], 0, []
+    metrics_log = MetricsLog(metrics_file) if metrics_file else None
+    options = {'streaming': streaming, 'parser': parser, 'metrics': metrics_log is not None,
+               'chunk_tokens': chunk_tokens, 'sections': sections, 'bilingual': bilingual,
+               'ir_cache': ir_cache_dir, 'formats': formats, 'deltas': deltas, 'section_spans': bundle_sections,
+               'act_timeout': act_timeout}
+    workers = [threading.Thread(target=fetch_worker, args=(fetcher, jobs, fetched, retries), daemon=True)
+               for _ in range(concurrency)]
+    writer = threading.Thread(target=write_worker, daemon=True,
+                              args=(rendered, slots, manifest, rebuilt, metrics_log, changes, bundle_writer,
+                                    journal, journal.run))
+
+    # spawn rather than fork: the download threads are already running and
+    # forking a threaded process can deadlock the children.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for worker in workers:
+            worker.start()
+        writer.start()
+
+        running = concurrency
+        while running:
+            item = fetched.get()
+            if item is None:
+                running -= 1
+                continue
+            xml_link, output_md_file, data, fetch_s, error = item
+            if data is None:
+                journal.fail(output_md_file, 'download', error)
+                continue
+
+            # Same XML, same converter, output still there: nothing to do
+            xml_hash = xml_sha256(data)
+            output_exists = None
+            if bundle_file:
+                output_exists = old_bundle is not None and bundle_key(output_md_file) in old_bundle
+            if not force and manifest.is_current(output_md_file, xml_hash, other_outputs(output_md_file),
+                                                 output_exists):
+                journal.settle(output_md_file, 'unchanged', manifest.history(output_md_file))
+                unchanged += 1
+                continue
+
+            print(f"Processing {xml_link}...")
+            slots.acquire()
+            act_id = os.path.basename(act_base(output_md_file))
+            future = pool.submit(convert_act, data, act_id, options, url_language(xml_link))
+            future.add_done_callback(lambda f, l=xml_link, o=output_md_file, h=xml_hash, t=fetch_s:
+                                     rendered.put((l, o, h, t, f)))
+
+    # Leaving the with-block waits for every conversion and its callback
+    rendered.put(None)
+    writer.join()
+    for worker in workers:
+        worker.join()
+
+    if bundle_writer is not None:
+        carried = 0
+        if old_bundle is not None:
+            for act in old_bundle.acts():
+                if act not in bundle_writer:
+                    bundle_writer.copy(old_bundle, act)
+                    carried += 1
+            old_bundle.close()
+        bundle_writer.close()
+        os.replace(bundle_file + '.tmp', bundle_file)
+        print(f"Bundle: {len(rebuilt)} acts written, {carried} carried over into {bundle_file}")
+    manifest.save()
+    journal.close(complete=True)
+
+    print(f"Rebuilt {len(rebuilt)} acts, {unchanged} unchanged")
+    if journal.failures:
+        print(f"{journal.failures} acts failed and will be retried next run (see {journal.path})")
+    if deltas:
+        # This sync's changes, including those an interrupted part of it
+        # found before it was resumed; an act not rebuilt has none
+        for output_md_file in restored:
+            try:
+                with open(changes_path(output_md_file), encoding='utf-8') as f:
+                    act_changes = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if act_changes.get('run') == journal.run:
+                changes.append(act_changes)
+        changes = [c for c in changes if c['added'] or c['removed'] or c['modified']]
+        write_run_changes(os.path.join(output_dir, RUN_CHANGES), journal.run, changes)
+        totals = {kind: sum(len(c[kind]) for c in changes) for kind in ('added', 'removed', 'modified')}
+        print(f"Section changes: {totals['added']} added, {totals['removed']} removed, "
+              f"{totals['modified']} modified in {len(changes)} acts (see {RUN_CHANGES})")
+
+    # What the conversions cost on this many processes in CSV order versus
+    # the order used, from each document's latest recorded conversion time
+    times = {output_md_file: manifest.history(output_md_file).get('convert_s') for _, output_md_file in job_list}
+    if any(t is not None for t in times.values()):
+        work = sum(t or 0.0 for t in times.values())
+        csv_makespan = simulated_makespan([times[o] or 0.0 for _, o in job_list], processes)
+        report = f"Conversion makespan on {processes} processes: {csv_makespan:.2f}s in CSV order"
+        if run_order is not job_list:
+            run_makespan = simulated_makespan([times[o] or 0.0 for _, o in run_order], processes)
+            report += f", {run_makespan:.2f}s longest first"
+        print(f"{report} ({work:.2f}s of conversion work)")
+
+    if mirror_dir:
+        counts = fetcher.counts
+        print(f"Mirror: {counts['downloaded']} downloaded, {counts['not_modified']} unchanged, "
+              f"{counts['offline']} read offline")
+
+    if sections:
+        # Each index covers one language (see corpus.py): the French
+        # sections of a bilingual sync go to a fra/ subdirectory of each
+        from corpus import language_dir, section_files
+        for language in ('eng', 'fra') if bilingual else ('eng',):
+            files = section_files(output_dir, language)
+            label = ' (French)' if language == 'fra' else ''
+
+            if bm25_dir:
+                # Re-index every act's sections, rebuilt this run or not
+                import lexical_index
+                start = time.perf_counter()
+                stats = lexical_index.build_index(files, language_dir(bm25_dir, language))
+                print(f"BM25 index{label}: {stats['docs']} sections, {stats['terms']} terms, "
+                      f"{stats['postings']} postings in {time.perf_counter() - start:.1f}s")
+
+            if xrefs_dir:
+                import xref_graph
+                stats = xref_graph.build_graph(files, language_dir(xrefs_dir, language))
+                print(f"Cross-reference graph{label}: {stats['nodes']} provisions, {stats['edges']} references")
+
+            if terms_dir:
+                import defined_terms
+                stats = defined_terms.build_term_index(files, language_dir(terms_dir, language))
+                print(f"Defined terms{label}: {stats['definitions']} definitions, {stats['terms']} distinct "
+                      f"terms, {stats['uses']} uses annotated")
+
+    if metrics_log is not None:
+        metrics_log.close()
+        metrics_log.print_summary()
+
+def add_sync_arguments(parser):
+    # The options of a full sync, shared with the "sync" command of xml_to_md_cli.py
+    parser.add_argument('--csv', nargs='+', default=['All Acts.csv'],
+                        help="CSV(s) with an 'xml_link' column, e.g. 'All Acts.csv' 'All Regulations.csv'")
+    parser.add_argument('--output-dir', default='md files')
+    parser.add_argument('--concurrency', type=int, default=8, help="number of acts downloaded in parallel")
+    parser.add_argument('--processes', type=int, default=None, help="number of conversion processes (default: all cores)")
+    parser.add_argument('--streaming', action='store_true', help="convert with iterparse, one section in memory at a time")
+    parser.add_argument('--mirror', default=None, help="directory keeping a local copy of the raw XML")
+    parser.add_argument('--offline', action='store_true', help="convert from the mirror without touching the network")
+    parser.add_argument('--mirror-compression', choices=list(MIRROR_COMPRESSION), default='gzip',
+                        help="how the mirror stores the XML (default gzip); copies stored otherwise are "
+                             "converted as they are used")
+    parser.add_argument('--force', action='store_true', help="rebuild every act even if its XML has not changed")
+    parser.add_argument('--parser', choices=['stdlib', 'lxml'], default='stdlib',
+                        help="XML parser backend; lxml falls back to xml.etree if not installed")
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help="write per-act and per-handler timings to FILE as JSON lines")
+    parser.add_argument('--chunks', type=int, nargs='?', const=512, default=None, metavar='TOKENS',
+                        help="also write section-aligned chunks for vector search, up to TOKENS each (default 512), "
+                             "to <act>.chunks.jsonl")
+    parser.add_argument('--bm25', default=None, metavar='DIR',
+                        help="also write <act>.sections.jsonl and rebuild a BM25 index of every section in DIR")
+    parser.add_argument('--xrefs', default=None, metavar='DIR',
+                        help="also write <act>.sections.jsonl and rebuild the cross-reference graph in DIR")
+    parser.add_argument('--terms', default=None, metavar='DIR',
+                        help="also write <act>.sections.jsonl and rebuild the defined-term index in DIR")
+    parser.add_argument('--bilingual', action='store_true',
+                        help="also convert the French version of each act (/fra/XML/) to <act>.fra.md and pair "
+                             "the two by provision in <act>.aligned.jsonl")
+    parser.add_argument('--schedule', choices=['longest-first', 'csv'], default='longest-first',
+                        help="convert the largest documents first (sizes from earlier runs, the mirror or HEAD "
+                             "requests) or in CSV order")
+    parser.add_argument('--ir-cache', default=None, metavar='DIR',
+                        help="keep a parsed intermediate form of each act in DIR, so re-rendering after a "
+                             "formatting change skips the XML parse (ignored with --metrics)")
+    parser.add_argument('--deltas', action='store_true',
+                        help="keep per-section fingerprints in <act>.fingerprints.json, write the sections "
+                             "added, removed or modified by each rebuild to <act>.changes.json and list the acts "
+                             "changed by this sync in sync-changes.json")
+    parser.add_argument('--bundle', default=None, metavar='FILE',
+                        help="write the Markdown of every act into one memory-mappable FILE with an offset "
+                             "index, instead of one .md file per act (read it with bundle.py)")
+    parser.add_argument('--bundle-sections', action='store_true',
+                        help="also index each Section in the bundle, as a slice of its act")
+    parser.add_argument('--formats', nargs='+', choices=['text', 'jsonl'], default=None,
+                        help="also write plain text (<act>.txt) and/or line records (<act>.lines.jsonl), "
+                             "rendered in the same pass as the Markdown")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="retry a download that failed on a dropped connection, a timeout or an HTTP 429/5xx "
+                             "this many times, backing off 1s, 2s, 4s, ...")
+    parser.add_argument('--act-timeout', type=float, default=300, metavar='SECONDS',
+                        help="give up on an act whose conversion takes longer than this (0: no limit)")
+    parser.add_argument('--restart', action='store_true',
+                        help="start over instead of resuming an interrupted sync from <output dir>/.sync-journal.jsonl")
+
+def run_sync(args):
+    main(csv_file=args.csv, output_dir=args.output_dir, concurrency=args.concurrency, processes=args.processes,
+         streaming=args.streaming, mirror_dir=args.mirror, offline=args.offline, force=args.force,
+         parser=args.parser, metrics_file=args.metrics, chunk_tokens=args.chunks, bm25_dir=args.bm25,
+         xrefs_dir=args.xrefs, terms_dir=args.terms, bilingual=args.bilingual, schedule=args.schedule,
+         ir_cache_dir=args.ir_cache, formats=args.formats, deltas=args.deltas, bundle_file=args.bundle,
+         bundle_sections=args.bundle_sections, retries=args.retries, act_timeout=args.act_timeout,
+         restart=args.restart, mirror_compression=args.mirror_compression)
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Justice Laws XML acts to Markdown.")
+    add_sync_arguments(parser)
+    run_sync(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,100 @@
+import os
+import sys
+import argparse
+import importlib
+
+# Command-line entry point for the converter in xml_to_md.py, installed as
+# `xml-to-md` by `pip install .` (or run as python xml_to_md_cli.py):
+#
+#   xml-to-md convert https://laws-lois.justice.gc.ca/eng/XML/I-3.3.xml
+#   xml-to-md convert I-3.3.xml -o "md files/I-3.3.md" --formats text jsonl
+#   xml-to-md chunk I-3.3.xml --max-tokens 512
+#   xml-to-md sync --csv "All Acts.csv" "All Regulations.csv" --mirror xml
+#
+# Nothing but the standard library is loaded until a command runs, and
+# each command loads only what it uses: converting one act never pays
+# for the sync's process pool or HTTP machinery.
+
+def load_converter():
+    return importlib.import_module('xml_to_md')
+
+def default_output(source, suffix):
+    # "I-3.3.xml", "I-3.3.xml.gz" or ".../eng/XML/I-3.3.xml" -> "I-3.3<suffix>" in the current directory
+    name = source.rstrip('/').split('/')[-1]
+    for compressed in ('.gz', '.zst'):
+        if name.lower().endswith(compressed):
+            name = name[:-len(compressed)]
+    return os.path.splitext(name)[0] + suffix
+
+def add_source_arguments(parser):
+    parser.add_argument('source', help="URL or local path of one act's or regulation's XML (.xml, .xml.gz or .xml.zst)")
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--parser', choices=['stdlib', 'lxml'], default='stdlib',
+                        help="XML parser backend; lxml falls back to xml.etree if not installed")
+    parser.add_argument('--language', choices=['eng', 'fra'], default=None,
+                        help="language of the XML (default: from /eng/ or /fra/ in the source)")
+
+def source_language(converter, args):
+    return args.language or converter.url_language(args.source)
+
+def source_parser(converter, args):
+    return converter.get_parser(args.parser, source_language(converter, args))
+
+def convert(argv):
+    parser = argparse.ArgumentParser(prog='xml-to-md convert', description="Convert one act to Markdown.")
+    add_source_arguments(parser)
+    parser.add_argument('--streaming', action='store_true', help="convert with iterparse, one section in memory at a time")
+    parser.add_argument('--formats', nargs='+', choices=['text', 'jsonl'], default=None,
+                        help="also write plain text (.txt) and/or line records (.lines.jsonl) next to the Markdown, "
+                             "in the same pass")
+    args = parser.parse_args(argv)
+
+    converter = load_converter()
+    output = args.output or default_output(args.source, '.md')
+    outputs = {name: converter.format_path(output, name) for name in args.formats or ()}
+    if not converter.xml_to_md(args.source, output, streaming=args.streaming,
+                               parser=source_parser(converter, args), outputs=outputs):
+        return 1
+    print(f"Generated {output}")
+    return 0
+
+def chunk(argv):
+    parser = argparse.ArgumentParser(prog='xml-to-md chunk',
+                                     description="Write one act's section-aligned chunks for vector search as JSON lines.")
+    add_source_arguments(parser)
+    parser.add_argument('--max-tokens', type=int, default=512)
+    args = parser.parse_args(argv)
+
+    converter = load_converter()
+    output = args.output or default_output(args.source, '.chunks.jsonl')
+    if not converter.chunk_xml(args.source, output, args.max_tokens, source_parser(converter, args),
+                               source_language(converter, args)):
+        return 1
+    print(f"Generated {output}")
+    return 0
+
+def sync(argv):
+    converter = load_converter()
+    parser = argparse.ArgumentParser(prog='xml-to-md sync',
+                                     description="Convert every act listed in the CSV(s), skipping unchanged ones.")
+    converter.add_sync_arguments(parser)
+    converter.run_sync(parser.parse_args(argv))
+    return 0
+
+COMMANDS = {
+    'convert': (convert, "convert one act to Markdown"),
+    'chunk': (chunk, "chunk one act for vector search"),
+    'sync': (sync, "convert every act in the CSV(s)"),
+}
+
+def main(argv=None):
+    # -> exit status: 0, or 1 if the act could not be converted
+    parser = argparse.ArgumentParser(prog='xml-to-md', description="Justice Laws XML to Markdown.",
+                                     epilog="; ".join(f"{name}: {help_text}" for name, (_, help_text) in COMMANDS.items()))
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="options of the command; see <command> --help")
+    args = parser.parse_args(argv)
+    return COMMANDS[args.command][0](args.args)
+
+if __name__ == "__main__":
+    sys.exit(main())
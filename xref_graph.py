@@ -0,0 +1,127 @@
+import os
+import json
+import argparse
+import numpy as np
+
+from corpus import LANGUAGES, section_files
+
+# Cross-reference graph over the <act>.sections.jsonl files written by
+# "XML to MD Scrapper v7.py --xrefs DIR". Nodes are provisions: a section
+# of an act (act, section), or a whole act or regulation (act, None) for
+# XRefExternal links, which name no section. Edges are stored twice in
+# CSR form so both directions are a single slice:
+#
+#   nodes.jsonl        [act, section] per node ID
+#   cites_offsets.npy  (nodes + 1,) node n cites cites[offsets[n]:offsets[n+1]]
+#   cites.npy          (edges,) int32 target node IDs
+#   cited_offsets.npy  (nodes + 1,) likewise for incoming references
+#   cited.npy          (edges,) int32 source node IDs
+#
+#   python xref_graph.py build "md files" xrefs
+#   python xref_graph.py cites xrefs A-1 12
+#   python xref_graph.py cited-by xrefs C-46
+
+def csr(sources, targets, count):
+    # Group `targets` by `sources` -> (offsets, targets ordered by source)
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=offsets[1:])
+    return offsets, targets[order].astype(np.int32)
+
+def build_graph(files, graph_dir):
+    os.makedirs(graph_dir, exist_ok=True)
+    nodes = {}
+    edges = set()
+
+    def node(act, section):
+        return nodes.setdefault((act, section), len(nodes))
+
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                source = node(record['act'], record['section'])
+                for act, section in record.get('xrefs', []):
+                    target = node(act, section)
+                    if target != source:
+                        edges.add((source, target))
+
+    edges = np.array(sorted(edges), dtype=np.int64).reshape(-1, 2)
+    cites_offsets, cites = csr(edges[:, 0], edges[:, 1], len(nodes))
+    cited_offsets, cited = csr(edges[:, 1], edges[:, 0], len(nodes))
+    arrays = {'cites_offsets.npy': cites_offsets, 'cites.npy': cites,
+              'cited_offsets.npy': cited_offsets, 'cited.npy': cited}
+    tmp = lambda name: os.path.join(graph_dir, name + '.tmp')
+    for name, array in arrays.items():
+        with open(tmp(name), 'wb') as f:
+            np.save(f, array)
+    with open(tmp('nodes.jsonl'), 'w', encoding='utf-8') as f:
+        for key in nodes:
+            f.write(json.dumps(list(key), ensure_ascii=False) + '\n')
+    for name in list(arrays) + ['nodes.jsonl']:
+        os.replace(tmp(name), os.path.join(graph_dir, name))
+    return {'nodes': len(nodes), 'edges': len(edges)}
+
+class XrefGraph:
+    def __init__(self, graph_dir):
+        path = lambda name: os.path.join(graph_dir, name)
+        with open(path('nodes.jsonl'), encoding='utf-8') as f:
+            self.nodes = [tuple(json.loads(line)) for line in f]
+        self.ids = {key: i for i, key in enumerate(self.nodes)}
+        self.cites_offsets = np.load(path('cites_offsets.npy'), mmap_mode='r')
+        self.cites_targets = np.load(path('cites.npy'), mmap_mode='r')
+        self.cited_offsets = np.load(path('cited_offsets.npy'), mmap_mode='r')
+        self.cited_sources = np.load(path('cited.npy'), mmap_mode='r')
+
+    def _neighbours(self, offsets, targets, act, section):
+        n = self.ids.get((act, section))
+        if n is None:
+            return []
+        return [self.nodes[i] for i in targets[offsets[n]:offsets[n + 1]]]
+
+    def cites(self, act, section=None):
+        # [(act, section or None)] referred to by this provision
+        return self._neighbours(self.cites_offsets, self.cites_targets, act, section)
+
+    def cited_by(self, act, section=None):
+        # [(act, section)] that refer to this provision; section=None asks
+        # about references to the act as a whole
+        return self._neighbours(self.cited_offsets, self.cited_sources, act, section)
+
+def format_node(node):
+    act, section = node
+    return f"{act} s. {section}" if section is not None else act
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-reference graph over converted statute sections.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="build the graph from every <act>.sections.jsonl in a directory")
+    build.add_argument('sections_dir')
+    build.add_argument('graph_dir')
+    build.add_argument('--language', choices=LANGUAGES, default='eng',
+                       help="index the English sections, or the French ones (<act>.fra.sections.jsonl)")
+    for command, help_text in (('cites', "what a provision refers to"), ('cited-by', "what refers to a provision")):
+        query = sub.add_parser(command, help=help_text)
+        query.add_argument('graph_dir')
+        query.add_argument('act')
+        query.add_argument('section', nargs='?', default=None, help="omit for the act as a whole")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        files = section_files(args.sections_dir, args.language)
+        if not files:
+            print(f"Error: no *.sections.jsonl files in '{args.sections_dir}'.")
+            return
+        stats = build_graph(files, args.graph_dir)
+        print(f"{stats['nodes']} provisions, {stats['edges']} references")
+    else:
+        graph = XrefGraph(args.graph_dir)
+        query = graph.cites if args.command == 'cites' else graph.cited_by
+        for node in query(args.act, args.section):
+            print(format_node(node))
+
+if __name__ == "__main__":
+    main()